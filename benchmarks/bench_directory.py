@@ -0,0 +1,109 @@
+"""
+Compares the `DirectoryIndex` lookup against the original pandas implementation of `get_relevant_people`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_directory --rows 50000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.data import get_df
+from src.directory import DirectoryIndex
+
+
+def pandas_relevant_people(df: DataFrame, parameters: dict) -> str:
+    """The pandas implementation `DirectoryIndex` replaces, kept as the reference."""
+    df = df.copy()
+    for name, column in [("department", "department"), ("position", "position")]:
+        if parameters.get(name):
+            filtered_df = df[df[column] == parameters[name]]
+            if not filtered_df.empty:
+                df = filtered_df
+    if parameters.get("responsibility"):
+        filtered_df = df[df["responsibilities"].str.contains(parameters["responsibility"])]
+        if not filtered_df.empty:
+            df = filtered_df
+    if parameters.get("program"):
+        filtered_df = df[df["programs"].dropna().str.contains(parameters["program"])]
+        if not filtered_df.empty:
+            df = filtered_df
+    if parameters.get("location"):
+        filtered_df = df[df["location"] == parameters["location"]]
+        if not filtered_df.empty:
+            df = filtered_df
+
+    relevant_people = list(map(DirectoryIndex.format_person, df.iloc))
+    if len(relevant_people) > 3:
+        return "Please provide more information."
+    return "Relevant people:\n- " + "\n- ".join(relevant_people)
+
+
+def scale(df: DataFrame, rows: int) -> DataFrame:
+    """Repeats the sample directory until it has the requested number of rows, keeping emails unique."""
+    copies = -(-rows // len(df))
+    frames = []
+    for i in range(copies):
+        frame = df.copy()
+        if i:
+            frame["email"] = frame["email"].str.replace("@", f".{i}@", regex=False)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).head(rows)
+
+
+def sample_parameters(df: DataFrame, count: int) -> list[dict]:
+    """Builds random tool call arguments from the values the assistant may choose from."""
+    choices = {
+        "department": list(df.department.unique()),
+        "position": list(df.position.unique()),
+        "responsibility": list(df.responsibilities.str.split(", ").explode().unique()),
+        "program": list(df.programs.str.split(", ").explode().loc[lambda s: s != ""].unique()),
+        "location": list(df.location.unique()),
+    }
+    rng = random.Random(0)
+    parameters = []
+    for _ in range(count):
+        names = rng.sample(list(choices), rng.randint(1, 3))
+        parameters.append({name: rng.choice(choices[name]) for name in names})
+    return parameters
+
+
+def measure(function, calls: list[dict]) -> tuple[float, list[str]]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = [function(parameters) for parameters in calls]
+        return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="number of directory rows")
+    parser.add_argument("--calls", type=int, default=200, help="number of lookups")
+    args = parser.parse_args()
+
+    df = scale(get_df(), args.rows)
+    calls = sample_parameters(df, args.calls)
+
+    start = time.perf_counter()
+    index = DirectoryIndex.from_df(df)
+    build_time = time.perf_counter() - start
+
+    pandas_time, expected = measure(lambda parameters: pandas_relevant_people(df, parameters), calls)
+    index_time, actual = measure(index.get_relevant_people, calls)
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+
+    print(f"rows: {len(df)}, calls: {len(calls)}, mismatches: {mismatches}")
+    print(f"index build: {build_time * 1000:.1f} ms")
+    for name, elapsed in [("pandas", pandas_time), ("index", index_time)]:
+        print(f"{name:>7}: {elapsed / len(calls) * 1000:.3f} ms/call")
+    print(f"speedup: {pandas_time / index_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
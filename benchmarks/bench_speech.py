@@ -0,0 +1,84 @@
+"""
+Compares the latency and throughput of the speech recognition backends on recorded voice messages.
+
+Record a few Telegram voice messages (.ogg) into a directory and run from the repository root:
+
+    python -m benchmarks.bench_speech samples/ --backends google vosk --language de-DE --concurrency 4
+
+The Vosk and Whisper backends are configured through `VOSK_MODELS` and `WHISPER_MODEL` like the bot itself.
+Decoding is done once up front, so only the recognition is measured.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+from src.speech import GoogleBackend, SpeechBackend, VoskBackend, WhisperBackend
+from src.voice import SAMPLE_RATE, SAMPLE_WIDTH, decode_ogg
+
+
+def create_backend(name: str) -> SpeechBackend:
+    if name == "vosk":
+        return VoskBackend(dict(entry.split("=", 1) for entry in os.environ["VOSK_MODELS"].split(",")))
+    if name == "whisper":
+        return WhisperBackend(os.getenv("WHISPER_MODEL", "base"))
+    return GoogleBackend()
+
+
+def recognize(backend: SpeechBackend, audio: sr.AudioData, language: str) -> tuple[float, str]:
+    start = time.perf_counter()
+    try:
+        text = backend.recognize(audio, language)
+    except (sr.UnknownValueError, sr.RequestError) as e:
+        text = f"<{type(e).__name__}>"
+    return time.perf_counter() - start, text
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", help="directory containing .ogg voice messages")
+    parser.add_argument("--backends", nargs="+", default=["google"], choices=["google", "vosk", "whisper"])
+    parser.add_argument("--language", default="de-DE", help="language code passed to the backends")
+    parser.add_argument("--concurrency", type=int, default=1, help="number of messages recognized in parallel")
+    parser.add_argument("--repeat", type=int, default=1, help="number of times each sample is recognized")
+    args = parser.parse_args()
+
+    files = sorted(os.path.join(args.samples, name) for name in os.listdir(args.samples) if name.endswith(".ogg"))
+    if not files:
+        parser.error(f"no .ogg files in {args.samples}")
+    audios = []
+    for file in files:
+        with open(file, "rb") as f:
+            audios.append(sr.AudioData(decode_ogg(f.read()), SAMPLE_RATE, SAMPLE_WIDTH))
+    seconds = sum(len(audio.frame_data) for audio in audios) / (SAMPLE_RATE * SAMPLE_WIDTH)
+    print(f"samples: {len(audios)} ({seconds:.1f} s of audio), concurrency: {args.concurrency}")
+
+    for name in args.backends:
+        start = time.perf_counter()
+        backend = create_backend(name)
+        load_time = time.perf_counter() - start
+
+        jobs = audios * args.repeat
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            results = list(executor.map(lambda audio: recognize(backend, audio, args.language), jobs))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for latency, _ in results]
+        print(f"\n{name}: loaded in {load_time:.2f} s")
+        print(f"  latency mean {statistics.mean(latencies) * 1000:.0f} ms, p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms")
+        print(f"  throughput {len(jobs) / elapsed:.2f} messages/s, real-time factor {elapsed / (seconds * args.repeat):.2f}")
+        for file, (_, text) in zip(files, results):
+            print(f"  {os.path.basename(file)}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures how long a fresh bot process takes until it can receive updates, with the compiled directory and with parsing
+the CSV file.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5
+
+Every run starts a new interpreter, imports `src.bot` and creates the `Bot`. "ready" is the time until polling could
+start; "assistant" is the time until the assistant, created in the background, is ready as well. The OpenAI API is
+replaced by the stand-in of the load test, so no request leaves the machine.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.loadtest.openai_stub import DEFAULT_SCRIPT, OpenAIStub
+
+# Executed in every fresh interpreter, printing the timings as JSON
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import src.bot
+imported = time.perf_counter()
+bot = src.bot.Bot("rossmann-beispiel.de", token="1:bench")
+ready = time.perf_counter()
+bot.assistant_loader.get()
+assistant = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "ready": ready - start,
+    "assistant": assistant - start,
+    "pandas": "pandas" in sys.modules,
+}))
+"""
+
+
+def run(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of processes started per variant")
+    args = parser.parse_args()
+
+    openai = OpenAIStub(DEFAULT_SCRIPT, ["stub@rossmann-beispiel.de"])
+    openai.start()
+    cache = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": openai.url,
+        "OPENAI_API_KEY": "stub",
+        "ASSISTANT_CACHE": os.path.join(cache, "assistant.json"),
+        "METRICS_PORT": "0",
+    }
+    variants = {
+        "compiled": {**env, "DIRECTORY_SNAPSHOT": os.path.join(cache, "directory.bin")},
+        "csv": {**env, "DIRECTORY_SNAPSHOT": ""},
+    }
+
+    # Compiles the directory and caches the assistant's id, like the first start after deploying
+    run(variants["compiled"])
+
+    for name, variant in variants.items():
+        results = [run(variant) for _ in range(args.runs)]
+        timings = ", ".join(f"{key} {statistics.median(result[key] for result in results) * 1000:.0f} ms" for key in ("import", "ready", "assistant"))
+        print(f"{name:>8}: {timings} (pandas imported: {results[0]['pandas']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from benchmarks.loadtest.driver import main
+
+main()
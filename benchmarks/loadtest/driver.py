@@ -0,0 +1,167 @@
+"""
+Replays synthetic conversations against the bot with stand-ins for the OpenAI and Telegram APIs and reports throughput,
+end-to-end latency and memory growth.
+
+Run from the repository root:
+
+    python -m benchmarks.loadtest --users 50 --conversations 20 --workers 8 --openai-latency 0.05
+
+Every simulated user sends a message, waits for the contact cards and the question for feedback, and likes the answer.
+The stand-ins run in a separate process, so the reported memory is the bot's own. The bot is configured through the
+environment as usual, e.g. `RESPONSE_CACHE_SIZE` or `STATE_STORE`; the stand-ins replace `OPENAI_BASE_URL` and the
+Telegram API URL only.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import threading
+import time
+from multiprocessing import Queue
+
+from benchmarks.loadtest.openai_stub import DEFAULT_SCRIPT, OpenAIStub
+from benchmarks.loadtest.telegram_stub import TelegramStub
+
+DOMAIN = "rossmann-beispiel.de"
+
+
+def run_stubs(args: argparse.Namespace, emails: list[str], script: list[dict], urls: Queue, replies: Queue):
+    openai = OpenAIStub(script, emails, args.openai_latency, args.run_time)
+    telegram = TelegramStub(replies, args.telegram_latency)
+    openai.start()
+    telegram.start()
+    urls.put((openai.url, telegram.url))
+    threading.Event().wait()
+
+
+def get_rss() -> int:
+    """The resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else float("nan")
+
+
+class Replies:
+    """Waits for the complete reply of a chat as reported by the Telegram stand-in."""
+
+    def __init__(self, queue: Queue):
+        self.queue = queue
+        self.events: dict[int, threading.Event] = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.receive, daemon=True).start()
+
+    def expect(self, chat_id: int) -> threading.Event:
+        event = threading.Event()
+        with self.lock:
+            self.events[chat_id] = event
+        return event
+
+    def receive(self):
+        while True:
+            chat_id, complete = self.queue.get()
+            if complete:
+                with self.lock:
+                    event = self.events.pop(chat_id, None)
+                if event is not None:
+                    event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="number of users chatting at the same time")
+    parser.add_argument("--conversations", type=int, default=10, help="number of conversations per user")
+    parser.add_argument("--workers", type=int, default=8, help="BOT_WORKERS of the bot (0 handles updates on telebot's threads)")
+    parser.add_argument("--stream", action="store_true", help="stream runs instead of polling them")
+    parser.add_argument("--composed-replies", action="store_true", help="send contacts and feedback buttons as one message")
+    parser.add_argument("--thread-pool-size", type=int, default=0, help="THREAD_POOL_SIZE of the bot")
+    parser.add_argument("--openai-latency", type=float, default=0.05, help="seconds every OpenAI request takes")
+    parser.add_argument("--run-time", type=float, default=0.0, help="seconds every run step stays in progress")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="seconds every Telegram request takes")
+    parser.add_argument("--script", help="JSON file with the steps of a run, see openai_stub.DEFAULT_SCRIPT")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a reply before it counts as failed")
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    from src.data import get_df
+    emails = [email for email in get_df(os.getenv("DIRECTORY_PATH", "res/data.csv"))["email"] if email.endswith("@" + DOMAIN)]
+
+    context = multiprocessing.get_context("spawn")
+    urls, reply_queue = context.Queue(), context.Queue()
+    stubs = context.Process(target=run_stubs, args=(args, emails, script, urls, reply_queue), daemon=True)
+    stubs.start()
+    openai_url, telegram_url = urls.get(timeout=30)
+
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["ASSISTANT_CACHE"] = os.path.join(tempfile.mkdtemp(), "assistant.json")
+    from telebot import apihelper
+    from telebot.types import Update
+    from src.bot import Bot
+    apihelper.API_URL = telegram_url
+
+    bot = Bot(DOMAIN, token="1:stub", workers=args.workers, stream=args.stream, thread_pool_size=args.thread_pool_size, composed_replies=args.composed_replies)
+    replies = Replies(reply_queue)
+    update_ids = itertools.count(1)
+    latencies: dict[str, list[float]] = {"message": [], "feedback": []}
+    failures = 0
+    failures_lock = threading.Lock()
+
+    def send(chat_id: int, kind: str, update: dict):
+        nonlocal failures
+        update["update_id"] = next(update_ids)
+        done = replies.expect(chat_id)
+        start = time.perf_counter()
+        bot.bot.process_new_updates([Update.de_json(update)])
+        if done.wait(args.timeout):
+            latencies[kind].append(time.perf_counter() - start)
+        else:
+            with failures_lock:
+                failures += 1
+
+    def simulate(user: int):
+        chat_id = 1000 + user
+        sender = {"id": chat_id, "is_bot": False, "first_name": f"User {user}", "language_code": "de"}
+        chat = {"id": chat_id, "type": "private"}
+        for conversation in range(args.conversations):
+            text = f"Mein VPN geht nicht ({user}/{conversation})"
+            send(chat_id, "message", {"message": {"message_id": 1, "date": 0, "chat": chat, "from": sender, "text": text}})
+            send(chat_id, "feedback", {"callback_query": {
+                "id": f"{chat_id}-{conversation}", "from": sender, "chat_instance": str(chat_id), "data": "like",
+                "message": {"message_id": 1, "date": 0, "chat": chat, "text": "?"},
+            }})
+
+    # The assistant and the voice recognizer are created in the background; wait for them, so they are not measured
+    bot.assistant_loader.get()
+    bot.voice_loader.get()
+    rss_before = get_rss()
+    start = time.perf_counter()
+    users = [threading.Thread(target=simulate, args=(user,)) for user in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - start
+    rss_after = get_rss()
+    stubs.terminate()
+
+    handled = sum(len(values) for values in latencies.values())
+    print(f"users: {args.users}, conversations: {args.users * args.conversations}, workers: {args.workers}, stream: {args.stream}, composed replies: {args.composed_replies}")
+    print(f"throughput: {handled / elapsed:.1f} messages/s ({handled} in {elapsed:.1f} s, {failures} timed out)")
+    for kind, values in latencies.items():
+        print(f"{kind} latency: p50 {percentile(values, 0.5) * 1000:.0f} ms, p95 {percentile(values, 0.95) * 1000:.0f} ms, p99 {percentile(values, 0.99) * 1000:.0f} ms")
+    print(f"memory: {rss_before / 2 ** 20:.1f} MiB before, {rss_after / 2 ** 20:.1f} MiB after, growth {(rss_after - rss_before) / 2 ** 20:+.1f} MiB")
+    os._exit(0)
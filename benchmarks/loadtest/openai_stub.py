@@ -0,0 +1,225 @@
+"""
+Stand-in for the OpenAI Assistants API endpoints used by the bot.
+
+Runs answering a user message follow a script: every step either requires tool calls or completes the run with a reply.
+Runs with instructions (greeting, feedback) complete right away. Replies may contain `{email}`, which is replaced by the
+email of a directory entry, so the bot answers with a contact card. Runs are polled as well as streamed.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Script used if none is given: one directory lookup, then a reply with the found contact
+DEFAULT_SCRIPT = [
+    {"tool_calls": [{"name": "get_relevant_people", "arguments": {"department": "IT-Betrieb", "position": "IT-Manager"}}]},
+    {"reply": "Bitte wende dich an {email}."},
+]
+
+
+class OpenAIStub:
+    """
+    Embedded HTTP server mimicking the Assistants endpoints with a fixed latency per request.
+
+    :param script: The steps of every run answering a user message.
+    :param emails: The emails replies are filled with, used round-robin.
+    :param latency: The number of seconds every request takes.
+    :param run_time: The number of seconds a run stays in progress before it reaches its next step.
+    """
+
+    def __init__(self, script: list[dict], emails: list[str], latency: float = 0.0, run_time: float = 0.0, port: int = 0):
+        self.script = script
+        self.emails = itertools.cycle(emails)
+        self.latency = latency
+        self.run_time = run_time
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.threads: dict[str, list[dict]] = {}
+        self.runs: dict[str, dict] = {}
+        self.requests = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.handle(self, "GET")
+
+            def do_POST(self):
+                stub.handle(self, "POST")
+
+            def do_DELETE(self):
+                stub.handle(self, "DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self.ids)}"
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        length = int(request.headers.get("Content-Length", 0))
+        body = json.loads(request.rfile.read(length)) if length else {}
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = request.path.split("?", 1)[0].removeprefix("/v1")
+        if method == "POST" and body.get("stream"):
+            return self.stream(request, path, body)
+
+        result = self.route(method, path, body)
+        if result is None:
+            return self.send(request, 404, {"error": {"message": f"Unknown endpoint {method} {path}"}})
+        self.send(request, 200, result, {"openai-poll-after-ms": str(int(self.run_time * 1000) or 1)})
+
+    @staticmethod
+    def send(request: BaseHTTPRequestHandler, status: int, result: dict, headers: Optional[dict] = None):
+        data = json.dumps(result).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def route(self, method: str, path: str, body: dict) -> Optional[dict]:
+        if method == "POST" and path == "/assistants":
+            return {"id": self.new_id("asst"), "object": "assistant", "metadata": body.get("metadata", {})}
+        if method == "POST" and re.fullmatch(r"/assistants/[^/]+", path):
+            return {"id": path.rsplit("/", 1)[1], "object": "assistant", "metadata": body.get("metadata", {})}
+        if method == "POST" and path == "/threads":
+            thread_id = self.new_id("thread")
+            with self.lock:
+                self.threads[thread_id] = []
+            return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+        if method == "DELETE" and re.fullmatch(r"/threads/[^/]+", path):
+            with self.lock:
+                self.threads.pop(path.rsplit("/", 1)[1], None)
+            return {"id": path.rsplit("/", 1)[1], "object": "thread.deleted", "deleted": True}
+
+        match = re.fullmatch(r"/threads/([^/]+)/messages", path)
+        if match:
+            if method == "POST":
+                return self.add_message(match[1], body["role"], body["content"])
+            with self.lock:
+                messages = list(reversed(self.threads.get(match[1], [])))
+            return {"object": "list", "data": messages, "has_more": False}
+
+        match = re.fullmatch(r"/threads/([^/]+)/runs", path)
+        if match and method == "POST":
+            return self.create_run(match[1], body)
+        match = re.fullmatch(r"/threads/([^/]+)/runs/([^/]+)", path)
+        if match and method == "GET":
+            return self.advance(match[2])
+        match = re.fullmatch(r"/threads/([^/]+)/runs/([^/]+)/submit_tool_outputs", path)
+        if match and method == "POST":
+            return self.submit_tool_outputs(match[2])
+        return None
+
+    def add_message(self, thread_id: str, role: str, content: str) -> dict:
+        message = {
+            "id": self.new_id("msg"),
+            "object": "thread.message",
+            "thread_id": thread_id,
+            "role": role,
+            "status": "completed",
+            "content": [{"type": "text", "text": {"value": content, "annotations": []}}],
+        }
+        with self.lock:
+            self.threads.setdefault(thread_id, []).append(message)
+        return message
+
+    def create_run(self, thread_id: str, body: dict) -> dict:
+        steps = [{"reply": "Okay."}] if body.get("instructions") else self.script
+        run = {"id": self.new_id("run"), "object": "thread.run", "thread_id": thread_id, "steps": steps, "step": 0, "ready_at": 0.0}
+        with self.lock:
+            self.runs[run["id"]] = run
+        return self.schedule(run)
+
+    def schedule(self, run: dict) -> dict:
+        run["ready_at"] = time.monotonic() + self.run_time
+        return self.render(run, "queued" if self.run_time else None)
+
+    def advance(self, run_id: str) -> dict:
+        run = self.runs[run_id]
+        return self.render(run, "in_progress" if time.monotonic() < run["ready_at"] else None)
+
+    def submit_tool_outputs(self, run_id: str) -> dict:
+        run = self.runs[run_id]
+        run["step"] += 1
+        return self.schedule(run)
+
+    def render(self, run: dict, status: Optional[str] = None) -> dict:
+        """Renders a run in its current step, adding the reply to the thread once the run completes."""
+        step = run["steps"][min(run["step"], len(run["steps"]) - 1)]
+        result = {"id": run["id"], "object": "thread.run", "thread_id": run["thread_id"], "status": status, "required_action": None, "usage": None}
+        if status is not None:
+            return result
+
+        if "tool_calls" in step:
+            result["status"] = "requires_action"
+            result["required_action"] = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [
+                {"id": self.new_id("call"), "type": "function", "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}}
+                for call in step["tool_calls"]
+            ]}}
+            return result
+
+        if "message" not in run:
+            run["message"] = self.add_message(run["thread_id"], "assistant", step["reply"].format(email=next(self.emails)))
+        result["status"] = "completed"
+        result["usage"] = {"prompt_tokens": 500, "completion_tokens": 50, "total_tokens": 550}
+        return result
+
+    def stream(self, request: BaseHTTPRequestHandler, path: str, body: dict):
+        match = re.fullmatch(r"/threads/([^/]+)/runs", path)
+        if match:
+            run = self.create_run(match[1], body)
+        else:
+            run = self.submit_tool_outputs(path.split("/")[4])
+        state = self.runs[run["id"]]
+
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Connection", "close")
+        request.end_headers()
+
+        def send_event(name: str, data: dict):
+            request.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+            request.wfile.flush()
+
+        send_event("thread.run.created", {**run, "status": "queued"})
+        if self.run_time:
+            time.sleep(self.run_time)
+        run = self.render(state)
+        if run["status"] == "requires_action":
+            send_event("thread.run.requires_action", run)
+        else:
+            message = state["message"]
+            send_event("thread.message.created", {**message, "status": "in_progress", "content": []})
+            send_event("thread.message.delta", {"id": message["id"], "object": "thread.message.delta", "delta": {"content": [
+                {"index": 0, "type": "text", "text": {"value": message["content"][0]["text"]["value"], "annotations": []}}
+            ]}})
+            send_event("thread.message.completed", message)
+            send_event("thread.run.completed", run)
+        request.wfile.write(b"event: done\ndata: [DONE]\n\n")
+        request.close_connection = True
@@ -0,0 +1,102 @@
+"""
+Stand-in for the Telegram Bot API methods used by the bot.
+
+Every message the bot sends is reported to the load test, which measures the time until a chat received its reply.
+A reply is complete once a message without buttons (a plain answer) or with the feedback buttons arrives; contact cards
+are followed by the question for feedback.
+"""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Queue
+from urllib.parse import parse_qs, urlparse
+
+# The bot's own user returned by `getMe`
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Ross", "username": "ross_bot"}
+
+
+class TelegramStub:
+    """
+    Embedded HTTP server mimicking the Bot API with a fixed latency per request.
+
+    :param replies: Receives (chat ID, whether the reply is complete) for every message sent by the bot.
+    :param latency: The number of seconds every request takes.
+    """
+
+    def __init__(self, replies: Queue, latency: float = 0.0, port: int = 0):
+        self.replies = replies
+        self.latency = latency
+        self.message_ids = itertools.count(1)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def do_POST(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/bot{{0}}/{{1}}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        url = urlparse(request.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        length = int(request.headers.get("Content-Length", 0))
+        if length:
+            request.rfile.read(length)
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        method = url.path.rsplit("/", 1)[-1]
+        if method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            result = self.message(params)
+            if method == "sendMessage":
+                self.replies.put((result["chat"]["id"], self.is_complete(params.get("reply_markup"))))
+        elif method == "getMe":
+            result = BOT_USER
+        else:
+            result = True
+
+        data = json.dumps({"ok": True, "result": result}).encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def message(self, params: dict) -> dict:
+        message_id = int(params["message_id"]) if "message_id" in params else next(self.message_ids)
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    @staticmethod
+    def is_complete(reply_markup: str | None) -> bool:
+        if not reply_markup:
+            return True
+        buttons = [button for row in json.loads(reply_markup).get("inline_keyboard", []) for button in row]
+        return any("callback_data" in button for button in buttons)
@@ -1,25 +1,91 @@
 import json
-from pandas import DataFrame
-from enum import Enum
 from telebot.types import User
-from openai import OpenAI
+from openai import OpenAI, NOT_GIVEN, NotGiven
 from openai.types.beta.threads.run import Run
-from typing import TypedDict, Literal
-from src.assistant_config import instruction, model, tools
+from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
+from typing import Literal, Optional, Callable
+from src.assistant_config import instruction, model
+from src.cache import LRUCache
+from src.directory import DirectoryService, DirectorySnapshot, FILTERS, MAX_RESULTS
+from src.intents import Intent, get_intent_router, get_template
+from src.metrics import metrics
+from src.registry import AssistantRegistry
+from src.response_cache import CachedResponse, get_response_cache
+from src.state import AssistantStatus, StateStore, Status, get_state_store
+from src.thread_pool import ConversationThreadPool
+from src.tools import ToolCall, get_tool_registry
+
+# Instructions for the runs that are not answering a user message
+GREETING = "Greet the user '{name}'. It is important to use the language '{language}' for the greeting."
+FEEDBACK_REQUEST = "Ask if the user is satisfied with your response. Do not ask if he needs further information."
+POSITIVE_FEEDBACK = "The user is satisfied. Say goodbye and thank them."
+NEGATIVE_FEEDBACK = "The user is unsatisfied. Be sorry. Think about how to improve and ask for clarification."
+
+# Questions for feedback sent with composed replies, by language
+FEEDBACK_QUESTIONS = {
+    "de": "Konnte ich dir damit weiterhelfen?",
+    "en": "Did this help you?",
+    "fr": "Est-ce que cela t'a aidé ?",
+    "es": "¿Te ha servido de ayuda?",
+    "it": "Ti è stato utile?",
+    "pl": "Czy to ci pomogło?",
+    "tr": "Bu sana yardımcı oldu mu?",
+}
+
+# Number of memoized `get_relevant_people` results
+RELEVANT_PEOPLE_CACHE_SIZE = 1024
+
+# Minimum cosine similarity of a person found by description, see `tests/test_embeddings.py`. The pre-ranking is
+# lexical; on `res/data.csv`, issues naming a subject of the directory score 0.14 and more, while off-topic messages
+# score below 0.1
+MIN_SIMILARITY = 0.12
+
+# Receives the response received so far while a run is streamed
+TextCallback = Callable[[str], None]
 
 
 class Assistant:
 
-    def __init__(self, df: DataFrame):
+    def __init__(self, directory: DirectoryService, stream: bool = False, thread_pool_size: int = 0, states: Optional[StateStore] = None):
         """
-        Initializes the Assistant with the provided DataFrame and configures it with the OpenAI API client.
+        Initializes the Assistant with the provided directory and configures it with the OpenAI API client.
 
-        :param df: A pandas DataFrame containing employee contact data.
+        :param directory: The service providing the current snapshot of the employee directory.
+        :param stream: Optional; whether runs are streamed instead of polled.
+        :param thread_pool_size: Optional; the number of conversation threads created ahead of time.
+        :param states: Optional; the store of the conversation states, configured by the environment if not provided.
         """
         self.client = OpenAI()
-        self.assistant = self.client.beta.assistants.create(instructions=instruction, model=model, tools=tools)
-        self.states: dict[int, AssistantStatus] = {}
-        self.df = df
+        self.threads = ConversationThreadPool(self.client, thread_pool_size)
+        self.stream = stream
+        self.registry = AssistantRegistry(self.client)
+        self.directory = directory
+        self.assistant_id = self.registry.get_assistant_id(instruction, model, directory.snapshot.tools)
+        self.directory.subscribe(self.update_tools)
+        self.responses = get_response_cache()
+        if self.responses is not None:
+            self.directory.subscribe(lambda snapshot: self.responses.clear())
+        self.relevant_people: LRUCache[tuple, str] = LRUCache(RELEVANT_PEOPLE_CACHE_SIZE)
+        self.directory.subscribe(lambda snapshot: self.relevant_people.clear())
+        self.tools = get_tool_registry()
+        self.tools.register("get_relevant_people", self.get_relevant_people)
+        self.tools.register("find_people_by_description", self.find_people_by_description)
+        self.intents = get_intent_router()
+        self.states = states if states is not None else get_state_store()
+        self.states.on_evict = lambda chat_id, state: self.threads.release(state["thread"])
+
+    def update_tools(self, snapshot: DirectorySnapshot):
+        """
+        Updates the assistant's tools after the directory changed, since their enums list the values of the directory.
+
+        The registry only updates the assistant if the enums actually changed.
+
+        :param snapshot: The new snapshot of the directory.
+        """
+        try:
+            self.assistant_id = self.registry.get_assistant_id(instruction, model, snapshot.tools)
+        except Exception as e:
+            print(f"Could not update assistant: {e}")
 
     def greet_user(self, chat_id: int, user: User) -> str:
         """
@@ -30,12 +96,7 @@ class Assistant:
         :return: A greeting message.
         """
         self.set_idle(chat_id)
-        run = self.client.beta.threads.runs.create_and_poll(
-            thread_id=self.get_thread(chat_id),
-            assistant_id=self.assistant.id,
-            instructions=f"Greet the user '{self.get_name(user)}'. It is important to use the language '{user.language_code}' for the greeting."
-        )
-        return self.handle_run(chat_id, run)
+        return self.run(chat_id, GREETING.format(name=self.get_name(user), language=user.language_code))
 
     def get_name(self, user: User) -> str:
         """
@@ -53,44 +114,191 @@ class Assistant:
             return name
         return user.username
 
-    def process_request(self, chat_id: int, request: str) -> str:
+    def process_request(self, chat_id: int, request: str, on_text: Optional[TextCallback] = None, language: str = "") -> str:
         """
         Processes a user's text request and decides whether to clarify or start processing based on the current state.
+        Trivial messages like greetings and thanks are answered from templates without a run, and without creating a
+        thread for a new chat.
 
         :param chat_id: The user's chat ID.
         :param request: The user's message or request.
+        :param on_text: Optional; called with the partial response while a streamed run is in progress.
+        :param language: Optional; the user's language code.
         :return: A response from the assistant.
         """
+        routed = self.route(chat_id, request, language)
+        if routed is not None:
+            reply, ends = routed
+            if ends:
+                self.set_idle(chat_id)
+            return reply
+
         if chat_id not in self.states:
             self.set_idle(chat_id)
 
-        status = self.get_status(chat_id)
-        if status == Assistant.Status.Processing:
-            return self.process_clarification(chat_id, request)
+        if self.continues_conversation(chat_id):
+            return self.process_clarification(chat_id, request, on_text)
+        else:
+            return self.process_idle(chat_id, request, on_text, language)
+
+    def route(self, chat_id: int, request: str, language: str = "") -> Optional[tuple[str, bool]]:
+        """
+        Answers a trivial message like a greeting or thanks from a template.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: The reply and whether it ends the current conversation, or None if the assistant has to answer.
+        """
+        routed = self.intents.route(request, language) if self.intents is not None else None
+        if routed is None:
+            return None
+        intent, reply = routed
+        return reply, self.ends_conversation(chat_id, intent)
+
+    def continues_conversation(self, chat_id: int) -> bool:
+        """
+        Checks if a message clarifies the conversation in progress instead of starting a new one. The response to a
+        clarified conversation depends on more than its first message, so it is not cached.
+
+        :param chat_id: The user's chat ID.
+        :return: True if the assistant is processing a conversation, otherwise False.
+        """
+        if self.get_status(chat_id) != Assistant.Status.Processing:
+            return False
+        if self.responses is not None:
+            self.responses.abandon(chat_id)
+        return True
+
+    def start_conversation(self, chat_id: int, request: str, language: str = ""):
+        """
+        Starts processing a conversation with a message. Only a conversation started on an idle thread is tracked for the
+        response cache. A message sent while the chat waits for feedback continues on the thread of the previous
+        conversation and may depend on it, like "und in Hamburg?", so its response is not cached under its text.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        """
+        idle = self.get_status(chat_id) == Assistant.Status.Idle
+        self.set_processing(chat_id)
+        if self.responses is None:
+            return
+        if idle:
+            self.responses.start(chat_id, request, language, self.directory.snapshot.version)
         else:
-            return self.process_idle(chat_id, request)
+            self.responses.abandon(chat_id)
 
-    def process_idle(self, chat_id: int, request: str) -> str:
+    def ends_conversation(self, chat_id: int, intent: Intent) -> bool:
         """
-        Processes a user's request when the assistant is in an idle state.
+        Checks if a message answered from a template ends the current conversation, so the next message starts a new one.
+        This is the case if the user cancels, or thanks for the contacts instead of giving feedback.
+
+        :param chat_id: The user's chat ID.
+        :param intent: The intent of the message.
+        :return: True if the conversation ends, otherwise False, also if the chat has no conversation yet.
+        """
+        state = self.states.get(chat_id)
+        if state is None:
+            return False
+        return intent == Intent.Cancel or (intent == Intent.Thanks and state["status"] == Assistant.Status.Feedback)
+
+    def process_idle(self, chat_id: int, request: str, on_text: Optional[TextCallback] = None, language: str = "") -> str:
+        """
+        Processes a user's request when the assistant is in an idle state or waiting for feedback.
 
         :param chat_id: The user's chat ID.
         :param request: The user's message or request.
+        :param on_text: Optional; called with the partial response while a streamed run is in progress.
+        :param language: Optional; the user's language code.
         :return: The clarification response from the assistant.
         """
-        self.states[chat_id]["status"] = Assistant.Status.Processing
-        return self.process_clarification(chat_id, request)
+        self.add_cached_context(chat_id)
+        self.start_conversation(chat_id, request, language)
+        return self.process_clarification(chat_id, request, on_text)
+
+    def get_cached_response(self, chat_id: int, request: str, language: str = "") -> Optional[CachedResponse]:
+        """
+        Answers a first message from the response cache, if the same message was answered with contacts before.
 
-    def process_clarification(self, chat_id: int, request: str) -> str:
+        The conversation waits for feedback afterwards, just like after an answer of the assistant. The exchange is only
+        added to the chat's thread if the conversation continues.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: The cached response, or None if the message has to be answered by the assistant.
+        """
+        cached = self.find_cached_response(chat_id, request, language)
+        if cached is not None:
+            if chat_id not in self.states:
+                self.set_idle(chat_id)
+            self.start_cached_conversation(chat_id, request, cached)
+        return cached
+
+    def find_cached_response(self, chat_id: int, request: str, language: str = "") -> Optional[CachedResponse]:
+        """
+        Looks up the cached response to a message, unless it clarifies the conversation in progress.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: The cached response, or None if the message has to be answered by the assistant.
+        """
+        if self.responses is None:
+            return None
+
+        state = self.states.get(chat_id)
+        if state is not None and state["status"] == Assistant.Status.Processing:
+            return None
+
+        return self.responses.get(request, language, self.directory.snapshot.version)
+
+    def start_cached_conversation(self, chat_id: int, request: str, cached: CachedResponse):
+        """
+        Waits for feedback on a conversation answered from the cache and remembers its exchange for the chat's thread.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param cached: The cached response the message is answered with.
+        """
+        self.responses.remember_context(chat_id, request, cached.response)
+        self.set_feedback(chat_id)
+
+    def cache_response(self, chat_id: int, emails: list[str], response: str, feedback: str):
+        """
+        Caches the contacts the assistant answered a conversation with, if the first message was enough to find them.
+
+        :param chat_id: The user's chat ID.
+        :param emails: The emails of the contacts.
+        :param response: The assistant's response listing the contacts.
+        :param feedback: The question for feedback sent after the contacts.
+        """
+        if self.responses is not None:
+            self.responses.complete(chat_id, emails, response, feedback)
+
+    def add_cached_context(self, chat_id: int):
+        """
+        Adds the exchange of a conversation answered from the cache to the chat's thread, so the assistant knows it.
+
+        :param chat_id: The user's chat ID.
+        """
+        context = self.responses.pop_context(chat_id) if self.responses is not None else None
+        if context is not None:
+            self.add_message(chat_id, "user", context[0])
+            self.add_message(chat_id, "assistant", context[1])
+
+    def process_clarification(self, chat_id: int, request: str, on_text: Optional[TextCallback] = None) -> str:
         """
         Clarifies the user's request by adding the message to the conversation thread.
 
         :param chat_id: The user's chat ID.
         :param request: The user's message or request.
+        :param on_text: Optional; called with the partial response while a streamed run is in progress.
         :return: The response from the assistant.
         """
         self.add_message(chat_id, "user", request)
-        return self.answer(chat_id)
+        return self.answer(chat_id, on_text)
 
     def add_message(self, chat_id: int, role: Literal["user", "assistant"], message: str):
         """
@@ -100,23 +308,41 @@ class Assistant:
         :param role: Either "user" or "assistant" depending on who sends the message.
         :param message: The content of the message.
         """
-        self.client.beta.threads.messages.create(
-            thread_id=self.get_thread(chat_id),
-            role=role,
-            content=message,
-        )
+        with metrics.time("openai_request_seconds", call="messages.create"):
+            self.client.beta.threads.messages.create(
+                thread_id=self.get_thread(chat_id),
+                role=role,
+                content=message,
+            )
 
-    def answer(self, chat_id: int) -> str:
+    def answer(self, chat_id: int, on_text: Optional[TextCallback] = None) -> str:
         """
         Generates and returns an answer from the assistant.
 
         :param chat_id: The user's chat ID.
+        :param on_text: Optional; called with the partial response while a streamed run is in progress.
+        :return: The assistant's response.
+        """
+        return self.run(chat_id, on_text=on_text)
+
+    def run(self, chat_id: int, instructions: str | NotGiven = NOT_GIVEN, on_text: Optional[TextCallback] = None) -> str:
+        """
+        Runs the assistant on the chat's thread and returns its response.
+
+        :param chat_id: The user's chat ID.
+        :param instructions: Optional; instructions overriding the assistant's default ones for this run.
+        :param on_text: Optional; called with the partial response while a streamed run is in progress.
         :return: The assistant's response.
         """
-        run = self.client.beta.threads.runs.create_and_poll(
-            thread_id=self.get_thread(chat_id),
-            assistant_id=self.assistant.id,
-        )
+        if self.stream:
+            return self.stream_run(chat_id, instructions, on_text)
+
+        with metrics.time("openai_request_seconds", call="runs.create_and_poll"):
+            run = self.client.beta.threads.runs.create_and_poll(
+                thread_id=self.get_thread(chat_id),
+                assistant_id=self.assistant_id,
+                instructions=instructions,
+            )
         return self.handle_run(chat_id, run)
 
     def handle_run(self, chat_id: int, run: Run) -> str:
@@ -128,9 +354,24 @@ class Assistant:
         :return: The assistant's response.
         """
         if run.status == "completed":
-            return self.client.beta.threads.messages.list(thread_id=self.get_thread(chat_id)).data[0].content[0].text.value
+            self.record_usage(run)
+            with metrics.time("openai_request_seconds", call="messages.list"):
+                messages = self.client.beta.threads.messages.list(thread_id=self.get_thread(chat_id))
+            return messages.data[0].content[0].text.value
         return self.add_function_outputs(chat_id, run)
 
+    @staticmethod
+    def record_usage(run: Run):
+        """
+        Records the tokens a completed run used.
+
+        :param run: The completed run.
+        """
+        if run.usage is not None:
+            metrics.increment("openai_tokens_total", run.usage.prompt_tokens, kind="prompt")
+            metrics.increment("openai_tokens_total", run.usage.completion_tokens, kind="completion")
+            metrics.observe("openai_run_tokens", run.usage.total_tokens)
+
     def add_function_outputs(self, chat_id: int, run: Run) -> str:
         """
         Processes and adds the function outputs (such as retrieving relevant people).
@@ -139,81 +380,126 @@ class Assistant:
         :param run: The result of the assistant's run.
         :return: The assistant's response including tool outputs.
         """
-        tool_outputs = []
-        for tool in run.required_action.submit_tool_outputs.tool_calls:
-            if tool.function.name == "get_relevant_people":
-                tool_outputs.append({
-                    "tool_call_id": tool.id,
-                    "output": self.get_relevant_people(json.loads(tool.function.arguments))
-                })
-            else:
-                raise Exception("Unsupported tool: " + tool.function.name)
-
-        tool_run = self.client.beta.threads.runs.submit_tool_outputs_and_poll(
-            thread_id=self.get_thread(chat_id),
-            run_id=run.id,
-            tool_outputs=tool_outputs
-        )
+        tool_outputs = self.get_tool_outputs(chat_id, run)
+        with metrics.time("openai_request_seconds", call="runs.submit_tool_outputs_and_poll"):
+            tool_run = self.client.beta.threads.runs.submit_tool_outputs_and_poll(
+                thread_id=self.get_thread(chat_id),
+                run_id=run.id,
+                tool_outputs=tool_outputs
+            )
 
         return self.handle_run(chat_id, tool_run)
 
-    def get_relevant_people(self, parameters: dict) -> str:
+    def stream_run(self, chat_id: int, instructions: str | NotGiven = NOT_GIVEN, on_text: Optional[TextCallback] = None) -> str:
+        """
+        Streams a run of the assistant on the chat's thread and returns its response.
+
+        Tool calls are answered as soon as the stream requires them and the response is taken from the stream's completed
+        message, so neither polling nor a separate request for the thread's messages is needed.
+
+        :param chat_id: The user's chat ID.
+        :param instructions: Optional; instructions overriding the assistant's default ones for this run.
+        :param on_text: Optional; called with the partial response whenever new text arrives.
+        :return: The assistant's response.
+        """
+        thread_id = self.get_thread(chat_id)
+        manager = self.client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=self.assistant_id, instructions=instructions)
+        response = ""
+        while manager is not None:
+            required = None
+            with metrics.time("openai_request_seconds", call="runs.stream"), manager as stream:
+                text = ""
+                for event in stream:
+                    if event.event == "thread.message.delta" and on_text is not None:
+                        for content in event.data.delta.content or []:
+                            if content.type == "text" and content.text.value:
+                                text += content.text.value
+                                on_text(text)
+                    elif event.event == "thread.message.completed":
+                        response = event.data.content[0].text.value
+                    elif event.event == "thread.run.completed":
+                        self.record_usage(event.data)
+                    elif event.event == "thread.run.requires_action":
+                        required = event.data
+
+            # The stream ends once the run requires action, so the tool calls are not part of the stream's duration
+            manager = None
+            if required is not None:
+                manager = self.client.beta.threads.runs.submit_tool_outputs_stream(
+                    thread_id=thread_id,
+                    run_id=required.id,
+                    tool_outputs=self.get_tool_outputs(chat_id, required)
+                )
+        return response
+
+    def get_tool_outputs(self, chat_id: int, run: Run) -> list[ToolOutput]:
+        """
+        Executes the tool calls the run requires concurrently, so their outputs can be submitted at once.
+
+        All tool calls of the run use the same snapshot of the directory, even if it is reloaded meanwhile.
+
+        :param chat_id: The user's chat ID.
+        :param run: The run requiring action.
+        :return: The outputs of all tool calls.
+        """
+        return self.tools.execute(self.directory.snapshot, self.get_tool_calls(chat_id, run))
+
+    def get_tool_calls(self, chat_id: int, run: Run) -> list[ToolCall]:
+        """
+        Parses the tool calls the run requires.
+
+        :param chat_id: The user's chat ID.
+        :param run: The run requiring action.
+        :return: The tool calls with their arguments.
+        """
+        calls = []
+        for tool in run.required_action.submit_tool_outputs.tool_calls:
+            arguments = json.loads(tool.function.arguments)
+            if tool.function.name == "get_relevant_people" and self.responses is not None:
+                self.responses.record(chat_id, arguments)
+            calls.append((tool.id, tool.function.name, arguments))
+        return calls
+
+    def get_relevant_people(self, snapshot: DirectorySnapshot, parameters: dict) -> str:
         """
         Finds and returns relevant people based on the provided filters like department, position, responsibility, etc.
 
+        The model often repeats a call with the same filters, so results are memoized by the filter values in a fixed order
+        together with the snapshot's version. The hit rate is available from `self.relevant_people`.
+
+        :param snapshot: The snapshot of the directory to search.
         :param parameters: A dictionary of filter parameters for finding relevant people.
         :return: A string listing the relevant people or a request for more details if too many results are found.
         """
-        department = parameters["department"] if "department" in parameters else None
-        position = parameters["position"] if "position" in parameters else None
-        responsibility = parameters["responsibility"] if "responsibility" in parameters else None
-        program = parameters["program"] if "program" in parameters else None
-        location = parameters["location"] if "location" in parameters else None
+        filters = tuple(parameters.get(name) or None for name, _, _ in FILTERS)
+        key = (snapshot.version,) + filters
+        result = self.relevant_people.get(key)
+        if result is not None:
+            return result
 
+        department, position, responsibility, program, location = filters
         print(f"department: {department}, position: {position}, responsibility: {responsibility}, program: {program}, location: {location}")
 
-        df = self.df.copy()
-        # Apply department filter
-        if department:
-            filtered_df = df[df["department"] == department]
-            if not filtered_df.empty:
-                df = filtered_df
-                print("Used filter department")
-
-        # Apply position filter
-        if position:
-            filtered_df = df[df["position"] == position]
-            if not filtered_df.empty:
-                df = filtered_df
-                print("Used filter position")
-
-        # Apply responsibility filter
-        if responsibility:
-            filtered_df = df[df["responsibilities"].str.contains(responsibility)]
-            if not filtered_df.empty:
-                df = filtered_df
-                print("Used filter responsibility")
-
-        # Apply program filter
-        if program:
-            filtered_df = df[df["programs"].dropna().str.contains(program)]
-            if not filtered_df.empty:
-                df = filtered_df
-                print("Used filter program")
-
-        # Apply location filter
-        if location:
-            filtered_df = df[df["location"] == location]
-            if not filtered_df.empty:
-                df = filtered_df
-                print("Used filter location")
-
-        relevant_people = list(map(lambda row: f"Name: {row['name']}, Email: {row['email']}, Department: {row['department']}, Position: {row['position']}, Programs: {row['programs']}, Responsibility: {row['description']}", df.iloc))
-        print(relevant_people)
-        if len(relevant_people) > 3:
+        result = snapshot.index.get_relevant_people(parameters)
+        self.relevant_people.put(key, result)
+        return result
+
+    def find_people_by_description(self, snapshot: DirectorySnapshot, parameters: dict) -> str:
+        """
+        Finds and returns the people whose responsibilities are most similar to a free-text description of the issue.
+
+        :param snapshot: The snapshot of the directory to search.
+        :param parameters: A dictionary with the description of the issue.
+        :return: A string listing the most similar people or a request for more details if no one is similar enough.
+        """
+        description = parameters.get("description", "")
+        print(f"description: {description}")
+
+        matches = snapshot.embeddings.search([description], MAX_RESULTS, MIN_SIMILARITY)[0]
+        if not matches:
             return "Please provide more information."
 
-        return "Relevant people:\n- " + "\n- ".join(relevant_people)
+        return "Relevant people:\n- " + "\n- ".join(snapshot.index.people[row] for row, _ in matches)
 
     def ask_for_feedback(self, chat_id: int) -> str:
         """
@@ -222,12 +508,17 @@ class Assistant:
         :param chat_id: The user's chat ID.
         :return: The assistant's feedback request message.
         """
-        run = self.client.beta.threads.runs.create_and_poll(
-            thread_id=self.get_thread(chat_id),
-            assistant_id=self.assistant.id,
-            instructions="Ask if the user is satisfied with your response. Do not ask if he needs further information."
-        )
-        return self.handle_run(chat_id, run)
+        return self.run(chat_id, FEEDBACK_REQUEST)
+
+    @staticmethod
+    def get_feedback_question(language: Optional[str] = "") -> Optional[str]:
+        """
+        Returns the question for feedback without asking the assistant, e.g. to send it along with the contacts.
+
+        :param language: Optional; the user's language code.
+        :return: The question for feedback in the user's language, or None if the assistant has to ask in their language.
+        """
+        return get_template(FEEDBACK_QUESTIONS, language)
 
     def positive_feedback(self, chat_id: int) -> str:
         """
@@ -237,12 +528,7 @@ class Assistant:
         :return: The assistant's response to positive feedback.
         """
         self.set_idle(chat_id)
-        run = self.client.beta.threads.runs.create_and_poll(
-            thread_id=self.get_thread(chat_id),
-            assistant_id=self.assistant.id,
-            instructions="The user is satisfied. Say goodbye and thank them."
-        )
-        return self.handle_run(chat_id, run)
+        return self.run(chat_id, POSITIVE_FEEDBACK)
 
     def negative_feedback(self, chat_id: int) -> str:
         """
@@ -251,13 +537,9 @@ class Assistant:
         :param chat_id: The user's chat ID.
         :return: The assistant's response to negative feedback.
         """
+        self.add_cached_context(chat_id)
         self.set_processing(chat_id)
-        run = self.client.beta.threads.runs.create_and_poll(
-            thread_id=self.get_thread(chat_id),
-            assistant_id=self.assistant.id,
-            instructions="The user is unsatisfied. Be sorry. Think about how to improve and ask for clarification."
-        )
-        return self.handle_run(chat_id, run)
+        return self.run(chat_id, NEGATIVE_FEEDBACK)
 
     def set_idle(self, chat_id: int):
         """
@@ -265,8 +547,20 @@ class Assistant:
 
         :param chat_id: The user's chat ID.
         """
-        thread = self.client.beta.threads.create()
-        self.states[chat_id] = {"status": Assistant.Status.Idle, "thread": thread.id}
+        self.release_conversation(chat_id)
+        self.states[chat_id] = {"status": Assistant.Status.Idle, "thread": self.threads.acquire()}
+
+    def release_conversation(self, chat_id: int):
+        """
+        Releases the thread and the cached exchange of the chat's current conversation before a new one starts.
+
+        :param chat_id: The user's chat ID.
+        """
+        state = self.states.get(chat_id)
+        if state is not None:
+            self.threads.release(state["thread"])
+        if self.responses is not None:
+            self.responses.pop_context(chat_id)
 
     def set_processing(self, chat_id: int):
         """
@@ -274,7 +568,7 @@ class Assistant:
 
         :param chat_id: The user's chat ID.
         """
-        self.states[chat_id]["status"] = Assistant.Status.Processing
+        self.set_status(chat_id, Assistant.Status.Processing)
 
     def set_feedback(self, chat_id: int):
         """
@@ -282,7 +576,16 @@ class Assistant:
 
         :param chat_id: The user's chat ID.
         """
-        self.states[chat_id]["status"] = Assistant.Status.Feedback
+        self.set_status(chat_id, Assistant.Status.Feedback)
+
+    def set_status(self, chat_id: int, status: "Assistant.Status"):
+        """
+        Sets the assistant's state for the specified chat ID, keeping the chat's thread.
+
+        :param chat_id: The user's chat ID.
+        :param status: The new status.
+        """
+        self.states[chat_id] = {"status": status, "thread": self.get_thread(chat_id)}
 
     def get_status(self, chat_id: int) -> "Assistant.Status":
         """
@@ -302,12 +605,5 @@ class Assistant:
         """
         return self.states[chat_id]["thread"]
 
-    class Status(Enum):
-        Idle = 0
-        Processing = 1
-        Feedback = 2
-
+    Status = Status
 
-class AssistantStatus(TypedDict):
-    status: Assistant.Status
-    thread: str
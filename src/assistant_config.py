@@ -1,49 +1,80 @@
-from src.data import get_df
-
-
-df = get_df()
-
 with open("res/instruction.txt", "r", encoding="utf-8") as f:
     instruction = f.read()
 
 model = "gpt-4o-mini"
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "get_relevant_people",
-            "description": "Get the most relevant people for a given employee issue.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "department": {
-                        "type": "string",
-                        "enum": list(df.department.unique()),
-                        "description": "The department the contact person should be in."
-                    },
-                    "position": {
-                        "type": "string",
-                        "enum": list(df.position.unique()),
-                        "description": "The position the contact person should be in."
-                    },
-                    "responsibility": {
-                        "type": "string",
-                        "enum": list(df.responsibilities.str.split(", ").explode().unique()),
-                        "description": "The responsibility the contact person should have."
+
+
+def unique(values) -> list[str]:
+    """
+    Returns the distinct values in order of their first occurrence.
+
+    :param values: The values.
+    :return: The distinct values.
+    """
+    return list(dict.fromkeys(values))
+
+
+def get_tools(records: list[dict]) -> list[dict]:
+    """
+    Builds the tool definitions of the assistant. The filter values of `get_relevant_people` are taken from the directory.
+
+    :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+    :return: The tool definitions.
+    """
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": "get_relevant_people",
+                "description": "Get the most relevant people for a given employee issue.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "department": {
+                            "type": "string",
+                            "enum": unique(row["department"] for row in records),
+                            "description": "The department the contact person should be in."
+                        },
+                        "position": {
+                            "type": "string",
+                            "enum": unique(row["position"] for row in records),
+                            "description": "The position the contact person should be in."
+                        },
+                        "responsibility": {
+                            "type": "string",
+                            "enum": unique(token for row in records for token in row["responsibilities"].split(", ")),
+                            "description": "The responsibility the contact person should have."
+                        },
+                        "program": {
+                            "type": "string",
+                            "enum": unique(token for row in records for token in row["programs"].split(", ")),
+                            "description": "The program which is related to the issue."
+                        },
+                        "location": {
+                            "type": "string",
+                            "enum": unique(row["location"] for row in records),
+                            "description": "The location where the contact person should be located."
+                        }
                     },
-                    "program": {
-                        "type": "string",
-                        "enum": list(df.programs.str.split(", ").explode().dropna().unique()),
-                        "description": "The program which is related to the issue."
+                    "required": []
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "find_people_by_description",
+                "description": "Find the people whose description, responsibilities and programs share the most words or word parts with a free-text description of an employee issue. The match is lexical, not semantic: synonyms and symptoms like 'geht nicht' or 'kaputt' find nobody. Use it when the issue does not clearly map to the filter values of get_relevant_people.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "description": {
+                            "type": "string",
+                            "description": "A short description of the issue in German, made of the subject terms the responsible people would list, e.g. 'Datenschutz Auskunft' or 'Vertrag Verlängerung'."
+                        }
                     },
-                    "location": {
-                        "type": "string",
-                        "enum": list(df.location.unique()),
-                        "description": "The location where the contact person should be located."
-                    }
-                },
-                "required": []
+                    "required": ["description"]
+                }
             }
         }
-    }
-]
+    ]
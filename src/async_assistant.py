@@ -0,0 +1,283 @@
+from telebot.types import User
+from openai import AsyncOpenAI, NOT_GIVEN, NotGiven
+from openai.types.beta.threads.run import Run
+from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
+from typing import Literal, Optional
+from src.directory import DirectoryService
+from src.metrics import metrics
+from src.response_cache import CachedResponse
+from src.assistant import Assistant, GREETING, FEEDBACK_REQUEST, POSITIVE_FEEDBACK, NEGATIVE_FEEDBACK
+from src.state import StateStore
+
+
+class AsyncAssistant(Assistant):
+    """
+    Variant of the `Assistant` for the asyncio bot that awaits all OpenAI requests instead of blocking.
+
+    State handling and tool execution are shared with the `Assistant`; every method talking to OpenAI is a coroutine.
+    """
+
+    def __init__(self, directory: DirectoryService, stream: bool = False, thread_pool_size: int = 0, states: Optional[StateStore] = None):
+        """
+        Initializes the Assistant with the provided directory and configures it with the async OpenAI API client.
+
+        The assistant itself is still looked up with the blocking client, since this only happens once before the event
+        loop starts. The thread pool keeps using the blocking client on its background thread as well, and so does the
+        assistant update after the directory is reloaded, which happens on the watcher thread.
+
+        :param directory: The service providing the current snapshot of the employee directory.
+        :param stream: Optional; whether runs are streamed instead of polled.
+        :param thread_pool_size: Optional; the number of conversation threads created ahead of time.
+        :param states: Optional; the store of the conversation states, configured by the environment if not provided.
+        """
+        super().__init__(directory, stream, thread_pool_size, states)
+        self.client = AsyncOpenAI()
+
+    async def greet_user(self, chat_id: int, user: User) -> str:
+        """
+        Greets the user in their preferred language based on their user profile.
+
+        :param chat_id: Telegram chat ID for the user.
+        :param user: The Telegram User object.
+        :return: A greeting message.
+        """
+        await self.set_idle(chat_id)
+        return await self.run(chat_id, GREETING.format(name=self.get_name(user), language=user.language_code))
+
+    async def process_request(self, chat_id: int, request: str, language: str = "") -> str:
+        """
+        Processes a user's text request and decides whether to clarify or start processing based on the current state.
+        Trivial messages like greetings and thanks are answered from templates without a run, and without creating a
+        thread for a new chat.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: A response from the assistant.
+        """
+        routed = self.route(chat_id, request, language)
+        if routed is not None:
+            reply, ends = routed
+            if ends:
+                await self.set_idle(chat_id)
+            return reply
+
+        if chat_id not in self.states:
+            await self.set_idle(chat_id)
+
+        if self.continues_conversation(chat_id):
+            return await self.process_clarification(chat_id, request)
+        else:
+            return await self.process_idle(chat_id, request, language)
+
+    async def process_idle(self, chat_id: int, request: str, language: str = "") -> str:
+        """
+        Processes a user's request when the assistant is in an idle state or waiting for feedback.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: The clarification response from the assistant.
+        """
+        await self.add_cached_context(chat_id)
+        self.start_conversation(chat_id, request, language)
+        return await self.process_clarification(chat_id, request)
+
+    async def get_cached_response(self, chat_id: int, request: str, language: str = "") -> Optional[CachedResponse]:
+        """
+        Answers a first message from the response cache, if the same message was answered with contacts before.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :param language: Optional; the user's language code.
+        :return: The cached response, or None if the message has to be answered by the assistant.
+        """
+        cached = self.find_cached_response(chat_id, request, language)
+        if cached is not None:
+            if chat_id not in self.states:
+                await self.set_idle(chat_id)
+            self.start_cached_conversation(chat_id, request, cached)
+        return cached
+
+    async def add_cached_context(self, chat_id: int):
+        """
+        Adds the exchange of a conversation answered from the cache to the chat's thread, so the assistant knows it.
+
+        :param chat_id: The user's chat ID.
+        """
+        context = self.responses.pop_context(chat_id) if self.responses is not None else None
+        if context is not None:
+            await self.add_message(chat_id, "user", context[0])
+            await self.add_message(chat_id, "assistant", context[1])
+
+    async def process_clarification(self, chat_id: int, request: str) -> str:
+        """
+        Clarifies the user's request by adding the message to the conversation thread.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message or request.
+        :return: The response from the assistant.
+        """
+        await self.add_message(chat_id, "user", request)
+        return await self.answer(chat_id)
+
+    async def add_message(self, chat_id: int, role: Literal["user", "assistant"], message: str):
+        """
+        Adds a message to the thread with a specific role (user or assistant).
+
+        :param chat_id: The user's chat ID.
+        :param role: Either "user" or "assistant" depending on who sends the message.
+        :param message: The content of the message.
+        """
+        with metrics.time("openai_request_seconds", call="messages.create"):
+            await self.client.beta.threads.messages.create(
+                thread_id=self.get_thread(chat_id),
+                role=role,
+                content=message,
+            )
+
+    async def answer(self, chat_id: int) -> str:
+        """
+        Generates and returns an answer from the assistant.
+
+        :param chat_id: The user's chat ID.
+        :return: The assistant's response.
+        """
+        return await self.run(chat_id)
+
+    async def run(self, chat_id: int, instructions: str | NotGiven = NOT_GIVEN) -> str:
+        """
+        Runs the assistant on the chat's thread and returns its response.
+
+        :param chat_id: The user's chat ID.
+        :param instructions: Optional; instructions overriding the assistant's default ones for this run.
+        :return: The assistant's response.
+        """
+        if self.stream:
+            return await self.stream_run(chat_id, instructions)
+
+        with metrics.time("openai_request_seconds", call="runs.create_and_poll"):
+            run = await self.client.beta.threads.runs.create_and_poll(
+                thread_id=self.get_thread(chat_id),
+                assistant_id=self.assistant_id,
+                instructions=instructions,
+            )
+        return await self.handle_run(chat_id, run)
+
+    async def handle_run(self, chat_id: int, run: Run) -> str:
+        """
+        Handles the run result and returns the response from the assistant.
+
+        :param chat_id: The user's chat ID.
+        :param run: The result of the assistant's run.
+        :return: The assistant's response.
+        """
+        if run.status == "completed":
+            self.record_usage(run)
+            with metrics.time("openai_request_seconds", call="messages.list"):
+                messages = await self.client.beta.threads.messages.list(thread_id=self.get_thread(chat_id))
+            return messages.data[0].content[0].text.value
+        return await self.add_function_outputs(chat_id, run)
+
+    async def add_function_outputs(self, chat_id: int, run: Run) -> str:
+        """
+        Processes and adds the function outputs (such as retrieving relevant people).
+
+        :param chat_id: The user's chat ID.
+        :param run: The result of the assistant's run.
+        :return: The assistant's response including tool outputs.
+        """
+        tool_outputs = await self.get_tool_outputs(chat_id, run)
+        with metrics.time("openai_request_seconds", call="runs.submit_tool_outputs_and_poll"):
+            tool_run = await self.client.beta.threads.runs.submit_tool_outputs_and_poll(
+                thread_id=self.get_thread(chat_id),
+                run_id=run.id,
+                tool_outputs=tool_outputs
+            )
+
+        return await self.handle_run(chat_id, tool_run)
+
+    async def get_tool_outputs(self, chat_id: int, run: Run) -> list[ToolOutput]:
+        """
+        Executes the tool calls the run requires concurrently without blocking the event loop.
+
+        :param chat_id: The user's chat ID.
+        :param run: The run requiring action.
+        :return: The outputs of all tool calls.
+        """
+        return await self.tools.execute_async(self.directory.snapshot, self.get_tool_calls(chat_id, run))
+
+    async def stream_run(self, chat_id: int, instructions: str | NotGiven = NOT_GIVEN) -> str:
+        """
+        Streams a run of the assistant on the chat's thread and returns its response.
+
+        :param chat_id: The user's chat ID.
+        :param instructions: Optional; instructions overriding the assistant's default ones for this run.
+        :return: The assistant's response.
+        """
+        thread_id = self.get_thread(chat_id)
+        manager = self.client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=self.assistant_id, instructions=instructions)
+        response = ""
+        while manager is not None:
+            required = None
+            with metrics.time("openai_request_seconds", call="runs.stream"):
+                async with manager as stream:
+                    async for event in stream:
+                        if event.event == "thread.message.completed":
+                            response = event.data.content[0].text.value
+                        elif event.event == "thread.run.completed":
+                            self.record_usage(event.data)
+                        elif event.event == "thread.run.requires_action":
+                            required = event.data
+
+            manager = None
+            if required is not None:
+                manager = self.client.beta.threads.runs.submit_tool_outputs_stream(
+                    thread_id=thread_id,
+                    run_id=required.id,
+                    tool_outputs=await self.get_tool_outputs(chat_id, required)
+                )
+        return response
+
+    async def ask_for_feedback(self, chat_id: int) -> str:
+        """
+        Asks the user for feedback on whether they are satisfied with the assistant's response.
+
+        :param chat_id: The user's chat ID.
+        :return: The assistant's feedback request message.
+        """
+        return await self.run(chat_id, FEEDBACK_REQUEST)
+
+    async def positive_feedback(self, chat_id: int) -> str:
+        """
+        Handles positive feedback by thanking the user and setting the assistant's state to idle.
+
+        :param chat_id: The user's chat ID.
+        :return: The assistant's response to positive feedback.
+        """
+        await self.set_idle(chat_id)
+        return await self.run(chat_id, POSITIVE_FEEDBACK)
+
+    async def negative_feedback(self, chat_id: int) -> str:
+        """
+        Handles negative feedback by apologizing and asking for clarification to improve the response.
+
+        :param chat_id: The user's chat ID.
+        :return: The assistant's response to negative feedback.
+        """
+        await self.add_cached_context(chat_id)
+        self.set_processing(chat_id)
+        return await self.run(chat_id, NEGATIVE_FEEDBACK)
+
+    async def set_idle(self, chat_id: int):
+        """
+        Sets the assistant's state to idle for the specified chat ID.
+
+        :param chat_id: The user's chat ID.
+        """
+        self.release_conversation(chat_id)
+        thread_id = self.threads.try_acquire()
+        if thread_id is None:
+            with metrics.time("openai_request_seconds", call="threads.create"):
+                thread_id = (await self.client.beta.threads.create()).id
+        self.states[chat_id] = {"status": Assistant.Status.Idle, "thread": thread_id}
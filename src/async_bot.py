@@ -0,0 +1,194 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING, Optional
+from weakref import WeakValueDictionary
+
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import Message
+
+from src.bot import Bot, LIKE, DISLIKE
+from src.directory import get_directory_service
+from src.metrics import start_metrics_server
+from src.preload import Preload
+
+if TYPE_CHECKING:
+    from src.async_assistant import AsyncAssistant
+    from src.transcription import TranscriptionExecutor
+    from src.voice import VoiceRecognizer
+
+
+class AsyncBot(Bot):
+    """
+    Variant of the `Bot` running on asyncio, so one process can serve many conversations without a thread per chat.
+
+    Updates of different chats are handled concurrently, while a lock per chat keeps the messages of one chat in order.
+    Handlers wait for the assistant and the voice recognizer created in the background with `Preload.get_async`, so
+    updates received during startup do not block the event loop.
+    """
+
+    def __init__(self, domain: str, token: str = "", stream: bool = False, thread_pool_size: int = 0, composed_replies: bool = False):
+        """
+        Initializes the bot with a domain (for filtering email contacts) and a telegram token for authentication.
+
+        :param domain: The email domain for filtering contacts.
+        :param token: Optional; the bot token, fetched from the environment `BOT_TOKEN` if not provided.
+        :param stream: Optional; whether assistant runs are streamed instead of polled.
+        :param thread_pool_size: Optional; the number of OpenAI threads created ahead of time for new conversations.
+        :param composed_replies: Optional; whether contacts and the question for feedback are sent as a single message.
+        """
+        self.bot = AsyncTeleBot(token or os.getenv("BOT_TOKEN"))
+        self.locks: WeakValueDictionary[int, asyncio.Lock] = WeakValueDictionary()
+
+        self.setup_handlers()
+
+        self.directory = get_directory_service()
+        self.assistant_loader = Preload(lambda: self.load_assistant(stream, thread_pool_size), "assistant-loader")
+        self.voice_loader = Preload(self.load_voice, "voice-loader")
+        self.domain = domain
+        self.composed_replies = composed_replies
+        self.register_gauges()
+
+    def create_assistant(self, stream: bool, thread_pool_size: int) -> "AsyncAssistant":
+        """
+        Creates the assistant on the async OpenAI client. The client is only imported here, so it is imported in the
+        background.
+
+        :param stream: Whether assistant runs are streamed instead of polled.
+        :param thread_pool_size: The number of OpenAI threads created ahead of time for new conversations.
+        :return: The assistant.
+        """
+        from src.async_assistant import AsyncAssistant
+
+        return AsyncAssistant(self.directory, stream, thread_pool_size)
+
+    def load_voice(self) -> tuple["VoiceRecognizer", Optional["TranscriptionExecutor"]]:
+        """
+        Creates the voice recognizer in the background. Voice messages are transcribed on a thread of the event loop, so
+        there is no transcription executor.
+
+        :return: The voice recognizer and None.
+        """
+        from src.voice import VoiceRecognizer, get_transcript_cache
+
+        voice_recognizer = VoiceRecognizer(self.bot, get_transcript_cache())
+        self.register_voice_gauges(voice_recognizer)
+        return voice_recognizer, None
+
+    def get_lock(self, chat_id: int) -> asyncio.Lock:
+        """
+        Returns the lock serializing the handling of a chat. Locks are dropped once no handler of the chat holds them.
+
+        :param chat_id: ID of the chat.
+        :return: The chat's lock.
+        """
+        lock = self.locks.get(chat_id)
+        if lock is None:
+            lock = self.locks[chat_id] = asyncio.Lock()
+        return lock
+
+    def setup_handlers(self):
+        """
+        Defines and registers the bot's message and callback query handlers.
+        """
+        @self.bot.message_handler(commands=["start", "hello", "init"])
+        async def send_welcome(message: Message):
+            chat_id = message.chat.id
+            await self.assistant_loader.get_async()
+            async with self.get_lock(chat_id):
+                await self.bot.send_message(chat_id, await self.assistant.greet_user(chat_id, message.from_user))
+
+        @self.bot.message_handler(func=lambda msg: True)
+        async def handle_text(message: Message):
+            await self.assistant_loader.get_async()
+            async with self.get_lock(message.chat.id):
+                await self.process_request(message.chat.id, message.text, message.from_user.language_code)
+
+        @self.bot.message_handler(func=lambda msg: True, content_types=["voice"])
+        async def handle_voice(message: Message):
+            await self.assistant_loader.get_async()
+            await self.voice_loader.get_async()
+            async with self.get_lock(message.chat.id):
+                language_code = message.from_user.language_code
+                request = self.voice_recognizer.get_cached(message.voice, language_code)
+                if request is None:
+                    file_info = await self.bot.get_file(message.voice.file_id)
+                    data = await self.bot.download_file(file_info.file_path)
+                    request = await asyncio.to_thread(self.voice_recognizer.transcribe, data, language_code, message.voice)
+                await self.process_request(message.chat.id, request, language_code)
+
+        @self.bot.callback_query_handler(func=lambda call: True)
+        async def handle_feedback_buttons(call):
+            await self.bot.answer_callback_query(call.id)
+            await self.assistant_loader.get_async()
+            chat_id = call.message.chat.id
+            async with self.get_lock(chat_id):
+                if call.data == LIKE:
+                    await self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=self.remove_feedback_buttons(call.message))
+                    await self.bot.send_message(chat_id, await self.assistant.positive_feedback(chat_id))
+                elif call.data == DISLIKE:
+                    await self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=self.remove_feedback_buttons(call.message))
+                    await self.bot.send_message(chat_id, await self.assistant.negative_feedback(chat_id))
+
+    async def process_request(self, chat_id: int, request: str, language: str = ""):
+        """
+        Processes incoming text requests. Checks if the request results in a contact lookup and sends appropriate responses.
+        Requests answered with contacts before are answered from the response cache without asking the assistant.
+
+        :param chat_id: ID of the chat where the request came from.
+        :param request: The user's message or recognized speech.
+        :param language: Optional; the user's language code.
+        """
+        cached = await self.assistant.get_cached_response(chat_id, request, language)
+        if cached is not None:
+            await self.send_messages(chat_id, self.render_contacts(cached.response, cached.feedback))
+            return
+
+        response = await self.assistant.process_request(chat_id, request, language)
+        if self.is_contact_response(response):
+            await self.answer_with_contacts(chat_id, response, language)
+        else:
+            await self.bot.send_message(chat_id, response)
+
+    async def answer_with_contacts(self, chat_id: int, response: str, language: str = ""):
+        """
+        Sends the contacts of a response, asks for feedback and caches the response, see `Bot.answer_with_contacts`.
+
+        :param chat_id: ID of the chat where the contacts are sent.
+        :param response: The assistant's response containing contact information.
+        :param language: Optional; the user's language code.
+        """
+        self.assistant.set_feedback(chat_id)
+        feedback = self.assistant.get_feedback_question(language) if self.composed_replies else None
+        await self.send_messages(chat_id, self.render_contacts(response, feedback))
+        if feedback is None:
+            feedback = await self.ask_for_feedback(chat_id)
+        self.assistant.cache_response(chat_id, self.get_emails(response), response, feedback)
+
+    async def ask_for_feedback(self, chat_id: int) -> str:
+        """
+        Asks the user for feedback (like/dislike) after providing a response.
+
+        :param chat_id: ID of the chat where feedback is requested.
+        :return: The question for feedback.
+        """
+        feedback = await self.assistant.ask_for_feedback(chat_id)
+        await self.bot.send_message(chat_id, feedback, reply_markup=self.create_feedback_buttons())
+        return feedback
+
+    async def send_messages(self, chat_id: int, messages: list[tuple[str, dict]]):
+        """
+        Sends rendered messages in order.
+
+        :param chat_id: ID of the chat where the messages are sent.
+        :param messages: The text and the options of every message, see `render_contacts`.
+        """
+        for text, options in messages:
+            await self.bot.send_message(chat_id, text, **options)
+
+    def start(self):
+        """
+        Starts the bot's event loop, waiting for messages and handling interactions indefinitely.
+        """
+        print("Bot is running...")
+        start_metrics_server()
+        asyncio.run(self.bot.infinity_polling())
@@ -1,12 +1,22 @@
 import re
 import os
+from typing import TYPE_CHECKING, Optional
 
-from telebot import TeleBot  
+from telebot import TeleBot, apihelper
 from telebot.types import Message, InlineKeyboardMarkup, InlineKeyboardButton  
 
-from src.assistant import Assistant
-from src.voice import VoiceRecognizer
-from src.data import get_df
+from src.contacts import Contact
+from src.directory import get_directory_service
+from src.dispatch import ChatDispatcher, DispatchingTeleBot
+from src.metrics import metrics, start_metrics_server
+from src.preload import Preload
+from src.streaming import LiveMessage
+from src.webhook import get_webhook_server
+
+if TYPE_CHECKING:
+    from src.assistant import Assistant
+    from src.transcription import TranscriptionExecutor
+    from src.voice import VoiceRecognizer
 
 # Constants used to handle feedback and contact actions
 LIKE = "like"  # Feedback constant for positive feedback
@@ -19,21 +29,120 @@ CALL_PREFIX = "call_"  # Prefix for phone-call-related interactions
 class Bot:
     """Main class for managing the bot's operations."""
 
-    def __init__(self, domain: str, token: str = ""):
+    def __init__(self, domain: str, token: str = "", workers: int = 0, stream: bool = False, live_replies: bool = False, thread_pool_size: int = 0, webhook: bool = False, composed_replies: bool = False):
         """
         Initializes the bot with a domain (for filtering email contacts) and a teelegram token for authentication.
 
         :param domain: The email domain for filtering contacts.
         :param token: Optional; the bot token, fetched from the environment `BOT_TOKEN` if not provided.
+        :param workers: Optional; the number of chats handled in parallel. Updates are handled on the polling thread if 0.
+        :param stream: Optional; whether assistant runs are streamed instead of polled.
+        :param live_replies: Optional; whether streamed replies are shown while they are generated. Requires `stream`.
+        :param thread_pool_size: Optional; the number of OpenAI threads created ahead of time for new conversations.
+        :param webhook: Optional; whether updates are received by webhook instead of polling them.
+        :param composed_replies: Optional; whether contacts and the question for feedback are sent as a single message.
         """
-        self.bot = TeleBot(token or os.getenv("BOT_TOKEN"))
+        token = token or os.getenv("BOT_TOKEN")
+        apihelper.CUSTOM_REQUEST_SENDER = send_telegram_request
+        if workers > 0:
+            self.dispatcher = ChatDispatcher(workers)
+            self.bot = DispatchingTeleBot(token, self.dispatcher)
+            metrics.gauge("dispatcher_queue_depth", lambda: self.dispatcher.queue_depth, "Updates waiting for a worker.")
+            metrics.gauge("dispatcher_in_flight", lambda: self.dispatcher.in_flight, "Updates being handled by a worker.")
+        else:
+            self.dispatcher = None
+            self.bot = TeleBot(token)
 
         self.setup_handlers()
 
-        self.df = get_df()
-        self.assistant = Assistant(self.df)
-        self.voice_recognizer = VoiceRecognizer(self.bot)
+        self.directory = get_directory_service()
+        self.assistant_loader = Preload(lambda: self.load_assistant(stream, thread_pool_size), "assistant-loader")
+        self.voice_loader = Preload(self.load_voice, "voice-loader")
         self.domain = domain
+        self.live_replies = stream and live_replies
+        self.webhook = webhook
+        self.composed_replies = composed_replies
+        self.register_gauges()
+
+    @property
+    def assistant(self) -> "Assistant":
+        """The assistant, waiting for it if it is still being created after startup."""
+        return self.assistant_loader.get()
+
+    @property
+    def voice_recognizer(self) -> "VoiceRecognizer":
+        """The voice recognizer, waiting for it if it is still being created after startup."""
+        return self.voice_loader.get()[0]
+
+    @property
+    def transcriber(self) -> Optional["TranscriptionExecutor"]:
+        """The executor transcribing voice messages in the background, or None if they are transcribed inline."""
+        return self.voice_loader.get()[1]
+
+    def create_assistant(self, stream: bool, thread_pool_size: int) -> "Assistant":
+        """
+        Creates the assistant. The OpenAI client is only imported here, so it is imported in the background.
+
+        :param stream: Whether assistant runs are streamed instead of polled.
+        :param thread_pool_size: The number of OpenAI threads created ahead of time for new conversations.
+        :return: The assistant.
+        """
+        from src.assistant import Assistant
+
+        return Assistant(self.directory, stream, thread_pool_size)
+
+    def load_assistant(self, stream: bool, thread_pool_size: int) -> "Assistant":
+        """
+        Creates the assistant in the background while the bot already receives updates, registers the gauges of its
+        caches and embeds the directory before the first search by description needs it.
+
+        :param stream: Whether assistant runs are streamed instead of polled.
+        :param thread_pool_size: The number of OpenAI threads created ahead of time for new conversations.
+        :return: The assistant.
+        """
+        assistant = self.create_assistant(stream, thread_pool_size)
+        metrics.gauge("relevant_people_cache_hit_rate", lambda: assistant.relevant_people.hit_rate, "Share of get_relevant_people calls answered from the memo.")
+        if assistant.responses is not None:
+            metrics.gauge("response_cache_hit_rate", lambda: assistant.responses.entries.hit_rate, "Share of first messages answered from the response cache.")
+        _ = self.directory.snapshot.embeddings
+        return assistant
+
+    def load_voice(self) -> tuple["VoiceRecognizer", Optional["TranscriptionExecutor"]]:
+        """
+        Creates the voice recognizer and the transcription executor in the background, importing the speech modules and
+        loading a local speech model only now.
+
+        Transcripts are handed back through the dispatcher, so voice messages are transcribed inline without one.
+
+        :return: The voice recognizer and the executor transcribing in the background, if configured.
+        """
+        from src.transcription import get_transcription_executor
+        from src.voice import VoiceRecognizer, get_transcript_cache
+
+        voice_recognizer = VoiceRecognizer(self.bot, get_transcript_cache())
+        self.register_voice_gauges(voice_recognizer)
+        if self.dispatcher is None:
+            if int(os.getenv("VOICE_WORKERS", 0)) > 0:
+                print("VOICE_WORKERS requires BOT_WORKERS > 0, transcribing voice messages inline.")
+            return voice_recognizer, None
+        return voice_recognizer, get_transcription_executor(voice_recognizer)
+
+    @staticmethod
+    def register_voice_gauges(voice_recognizer: "VoiceRecognizer"):
+        """
+        Registers the gauges of the transcript cache with the metrics.
+
+        :param voice_recognizer: The voice recognizer.
+        """
+        if voice_recognizer.cache is not None:
+            metrics.gauge("transcript_cache_hit_rate", lambda: voice_recognizer.cache.transcripts.hit_rate, "Share of voice messages answered from the transcript cache.")
+
+    def register_gauges(self):
+        """
+        Registers the gauges of the directory with the metrics. The gauges of the assistant and the voice recognizer are
+        registered once they are created.
+        """
+        metrics.gauge("directory_version", lambda: self.directory.snapshot.version, "Number of reloads of the directory.")
 
     def setup_handlers(self):
         """
@@ -46,45 +155,120 @@ class Bot:
 
         @self.bot.message_handler(func=lambda msg: True)
         def handle_text(message: Message):
-            self.process_request(message.chat.id, message.text)
+            self.process_request(message.chat.id, message.text, message.from_user.language_code)
 
         @self.bot.message_handler(func=lambda msg: True, content_types=["voice"])
         def handle_voice(message: Message):
-            self.process_request(message.chat.id, self.voice_recognizer.recognize_speech(message.voice, message.from_user))
+            if self.transcriber is None:
+                self.process_request(message.chat.id, self.voice_recognizer.recognize_speech(message.voice, message.from_user), message.from_user.language_code)
+            else:
+                self.submit_voice(message)
 
         @self.bot.callback_query_handler(func=lambda call: True)
         def handle_feedback_buttons(call):
             self.bot.answer_callback_query(call.id)
             chat_id = call.message.chat.id
             if call.data == LIKE:
-                self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=None)
+                self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=self.remove_feedback_buttons(call.message))
                 self.bot.send_message(chat_id, self.assistant.positive_feedback(chat_id))
             elif call.data == DISLIKE:
-                self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=None)
+                self.bot.edit_message_reply_markup(chat_id, call.message.message_id, reply_markup=self.remove_feedback_buttons(call.message))
                 self.bot.send_message(chat_id, self.assistant.negative_feedback(chat_id))
 
-    def process_request(self, chat_id: int, request: str):
+    def submit_voice(self, message: Message):
+        """
+        Transcribes a voice message in the background. The chat's dispatcher queue keeps a place for the transcript as
+        soon as the message arrives, so later messages of the chat are handled after it, while the worker is free for
+        other chats meanwhile. Cached transcripts are processed right away without taking a slot of the executor.
+
+        :param message: The voice message.
+        """
+        chat_id = message.chat.id
+        language_code = message.from_user.language_code
+        cached = self.voice_recognizer.get_cached(message.voice, language_code)
+        if cached is not None:
+            self.process_request(chat_id, cached, language_code)
+            return
+
+        reservation = self.dispatcher.reserve(chat_id)
+        accepted = self.transcriber.submit(
+            message.voice,
+            message.from_user,
+            lambda text: reservation.fill(self.process_request, chat_id, text, language_code),
+            lambda error: reservation.fill(self.bot.send_message, chat_id, error),
+        )
+        if not accepted:
+            from src.transcription import BUSY_MESSAGE
+
+            reservation.fill(self.bot.send_message, chat_id, BUSY_MESSAGE)
+
+    def process_request(self, chat_id: int, request: str, language: str = ""):
         """
         Processes incoming text requests. Checks if the request results in a contact lookup and sends appropriate responses.
+        Requests answered with contacts before are answered from the response cache without asking the assistant.
 
         :param chat_id: ID of the chat where the request came from.
         :param request: The user's message or recognized speech.
+        :param language: Optional; the user's language code.
         """
-        response = self.assistant.process_request(chat_id, request)
+        cached = self.assistant.get_cached_response(chat_id, request, language)
+        if cached is not None:
+            self.send_messages(chat_id, self.render_contacts(cached.response, cached.feedback))
+            return
+
+        if self.live_replies:
+            return self.process_request_live(chat_id, request, language)
+
+        response = self.assistant.process_request(chat_id, request, language=language)
         if self.is_contact_response(response):
-            self.send_contacts(chat_id, response)
-            self.assistant.set_feedback(chat_id)
-            self.ask_for_feedback(chat_id)
+            self.answer_with_contacts(chat_id, response, language)
         else:
             self.bot.send_message(chat_id, response)
 
-    def ask_for_feedback(self, chat_id: int):
+    def process_request_live(self, chat_id: int, request: str, language: str = ""):
+        """
+        Processes incoming text requests like `process_request`, but shows the response while it is generated.
+        Contact responses are replaced by the contact cards once they are complete.
+
+        :param chat_id: ID of the chat where the request came from.
+        :param request: The user's message or recognized speech.
+        :param language: Optional; the user's language code.
+        """
+        reply = LiveMessage(self.bot, chat_id)
+        response = self.assistant.process_request(chat_id, request, reply.update, language)
+        if self.is_contact_response(response):
+            reply.discard()
+            self.answer_with_contacts(chat_id, response, language)
+        else:
+            reply.finish(response)
+
+    def answer_with_contacts(self, chat_id: int, response: str, language: str = ""):
+        """
+        Sends the contacts of a response, asks for feedback and caches the response. Composed replies send both as a
+        single message and take the question for feedback from a template instead of asking the assistant, unless there
+        is no template in the user's language.
+
+        :param chat_id: ID of the chat where the contacts are sent.
+        :param response: The assistant's response containing contact information.
+        :param language: Optional; the user's language code.
+        """
+        self.assistant.set_feedback(chat_id)
+        feedback = self.assistant.get_feedback_question(language) if self.composed_replies else None
+        self.send_messages(chat_id, self.render_contacts(response, feedback))
+        if feedback is None:
+            feedback = self.ask_for_feedback(chat_id)
+        self.assistant.cache_response(chat_id, self.get_emails(response), response, feedback)
+
+    def ask_for_feedback(self, chat_id: int) -> str:
         """
         Asks the user for feedback (like/dislike) after providing a response.
 
         :param chat_id: ID of the chat where feedback is requested.
+        :return: The question for feedback.
         """
-        self.bot.send_message(chat_id, self.assistant.ask_for_feedback(chat_id), reply_markup=self.create_feedback_buttons())
+        feedback = self.assistant.ask_for_feedback(chat_id)
+        self.bot.send_message(chat_id, feedback, reply_markup=self.create_feedback_buttons())
+        return feedback
 
     def create_feedback_buttons(self) -> InlineKeyboardMarkup:
         """
@@ -98,6 +282,18 @@ class Bot:
         markup.add(thumbs_up, thumbs_down)
         return markup
 
+    @staticmethod
+    def remove_feedback_buttons(message: Message) -> Optional[InlineKeyboardMarkup]:
+        """
+        Removes the feedback buttons from a message once feedback was given, keeping the contact actions of composed replies.
+
+        :param message: The message with the feedback buttons.
+        :return: The remaining buttons of the message, or None if there are none.
+        """
+        keyboard = message.reply_markup.keyboard if message.reply_markup is not None else []
+        rows = [row for row in keyboard if not any(button.callback_data for button in row)]
+        return InlineKeyboardMarkup(rows) if rows else None
+
     def get_emails(self, text: str) -> list[str]:
         """
         Extracts email addresses from a given text that match the specified domain.
@@ -116,47 +312,151 @@ class Bot:
         """
         return len(self.get_emails(msg)) > 0
 
-    def send_contacts(self, chat_id: int, msg: str):
+    def send_messages(self, chat_id: int, messages: list[tuple[str, dict]]):
+        """
+        Sends rendered messages in order.
+
+        :param chat_id: ID of the chat where the messages are sent.
+        :param messages: The text and the options of every message, see `render_contacts`.
         """
-        Sends contact information based on emails found in the message.
+        for text, options in messages:
+            self.bot.send_message(chat_id, text, **options)
+
+    def find_contacts(self, msg: str) -> list[tuple[str, Contact]]:
+        """
+        Looks up the contacts of the emails found in a message.
 
-        :param chat_id: ID of the chat where contact info is sent.
         :param msg: The message containing contact information.
+        :return: The email and the contact details of every contact in the directory.
+        """
+        contacts = self.directory.snapshot.contacts
+        return [(email, contact) for email in self.get_emails(msg) if (contact := contacts.get(email)) is not None]
+
+    def render_contacts(self, msg: str, feedback: Optional[str] = None) -> list[tuple[str, dict]]:
         """
-        for email in self.get_emails(msg):
-            contact = self.df[self.df["email"].str.contains(email, case=False, na=False)]
-            
-            def field(field_name: str) -> str:
-                return contact[field_name].values[0]
+        Renders the contacts found in a message, followed by the question for feedback if given, into the messages sending
+        them. Composed replies render everything into a single message, otherwise every contact gets its own card.
 
-            markup = self.create_contact_markup(email)
-            self.bot.send_message(chat_id, f"*{field('name')}*\n{field('position')} @ {field('department')}", reply_markup=markup, parse_mode="markdown")
+        :param msg: The message containing contact information.
+        :param feedback: Optional; the question for feedback.
+        :return: The text and the options of `send_message` of every message.
+        """
+        if self.composed_replies and feedback is not None:
+            text, markup = self.compose_contacts(msg, feedback)
+            return [(text, {"reply_markup": markup, "parse_mode": "markdown"})]
+
+        messages = [
+            (f"*{contact.name}*\n{contact.position} @ {contact.department}", {"reply_markup": self.create_contact_markup(email, contact), "parse_mode": "markdown"})
+            for email, contact in self.find_contacts(msg)
+        ]
+        if feedback is not None:
+            messages.append((feedback, {"reply_markup": self.create_feedback_buttons()}))
+        return messages
+
+    def compose_contacts(self, msg: str, feedback: str) -> tuple[str, InlineKeyboardMarkup]:
+        """
+        Renders all contacts found in a message and the question for feedback into the text and buttons of one message.
+        Each contact gets a row of actions, numbered like the contacts if there are several, followed by the feedback row.
 
-    def create_contact_markup(self, email: str) -> InlineKeyboardMarkup:
+        :param msg: The message containing contact information.
+        :param feedback: The question for feedback.
+        :return: The text and the buttons of the message.
+        """
+        found = self.find_contacts(msg)
+
+        markup = InlineKeyboardMarkup()
+        cards = []
+        for number, (email, contact) in enumerate(found, 1):
+            label = f" {number}" if len(found) > 1 else ""
+            prefix = f"{number}. " if len(found) > 1 else ""
+            cards.append(f"{prefix}*{contact.name}*\n{contact.position} @ {contact.department}")
+            markup.row(*self.create_contact_buttons(email, contact, label))
+        markup.keyboard.extend(self.create_feedback_buttons().keyboard)
+        return "\n\n".join(cards + [feedback]), markup
+
+    def create_contact_markup(self, email: str, contact: Contact) -> InlineKeyboardMarkup:
         """
         Creates an inline keyboard with contact actions (chat, email, call).
 
         :param email: The email of the contact.
+        :param contact: The contact details of the email.
         :return: InlineKeyboardMarkup with buttons for chat, email, and call.
         """
-        contact = self.df[self.df["email"].str.contains(email, case=False, na=False)]
-        phone_number = contact["phone"].values[0]
+        markup = InlineKeyboardMarkup(row_width=3)
+        markup.add(*self.create_contact_buttons(email, contact))
+        return markup
+
+    def create_contact_buttons(self, email: str, contact: Contact, label: str = "") -> list[InlineKeyboardButton]:
+        """
+        Creates the contact actions (chat, email, call) of a contact.
+
+        :param email: The email of the contact.
+        :param contact: The contact details of the email.
+        :param label: Optional; appended to the icon of every button, e.g. the number of the contact.
+        :return: The buttons for chat, email, and call.
+        """
+        phone_number = contact.phone
 
         telegram_url = f"https://t.me/AICentaurBot"  # Telegram deep link (placeholder).
         email_url = f"https://ai-hackathon-2024-redirect.j-konratt.workers.dev?email={email}"
         tel_url = f"https://ai-hackathon-2024-redirect.j-konratt.workers.dev?tel={phone_number}"
 
-        markup = InlineKeyboardMarkup(row_width=3)
-        chat_action = InlineKeyboardButton("💬", url=telegram_url)
-        email_action = InlineKeyboardButton("✉", url=email_url)
-        tel_action = InlineKeyboardButton("📞", url=tel_url)
+        chat_action = InlineKeyboardButton("💬" + label, url=telegram_url)
+        email_action = InlineKeyboardButton("✉" + label, url=email_url)
+        tel_action = InlineKeyboardButton("📞" + label, url=tel_url)
 
-        markup.add(chat_action, email_action, tel_action)
-        return markup
+        return [chat_action, email_action, tel_action]
 
     def start(self):
         """
         Starts the bot's event loop, waiting for messages and handling interactions indefinitely.
         """
         print("Bot is running...")
-        self.bot.infinity_polling()
+        start_metrics_server()
+        if self.webhook:
+            get_webhook_server(self.bot).serve()
+        else:
+            self.bot.infinity_polling()
+
+
+def send_telegram_request(method: str, url: str, **kwargs):
+    """
+    Sends a request to the Telegram Bot API on telebot's session and records its duration by API method.
+
+    :param method: The HTTP method.
+    :param url: The URL of the API method.
+    :param kwargs: The arguments of the request.
+    :return: The response.
+    """
+    with metrics.time("telegram_request_seconds", method=url.rsplit("/", 1)[-1]):
+        return apihelper._get_req_session().request(method, url, **kwargs)
+
+
+def get_bot(domain: str, mode: str = "") -> Bot:
+    """
+    Creates the bot configured by the environment.
+
+    - `BOT_MODE` selects the threaded bot (`sync`, default) or the `AsyncBot` (`async`).
+    - `BOT_WORKERS`, `STREAM_RUNS`, `LIVE_REPLIES`, `THREAD_POOL_SIZE`, `UPDATE_MODE` and `COMPOSED_REPLIES` configure it as
+      described in the README.
+
+    :param domain: The email domain for filtering contacts.
+    :param mode: Optional; `sync` or `async`, fetched from the environment `BOT_MODE` if not provided.
+    :return: The bot.
+    """
+    stream = os.getenv("STREAM_RUNS") == "1"
+    thread_pool_size = int(os.getenv("THREAD_POOL_SIZE", "0"))
+    composed_replies = os.getenv("COMPOSED_REPLIES") == "1"
+    if (mode or os.getenv("BOT_MODE", "sync")) == "async":
+        from src.async_bot import AsyncBot
+
+        return AsyncBot(domain, stream=stream, thread_pool_size=thread_pool_size, composed_replies=composed_replies)
+    return Bot(
+        domain,
+        workers=int(os.getenv("BOT_WORKERS", "0")),
+        stream=stream,
+        live_replies=os.getenv("LIVE_REPLIES") == "1",
+        thread_pool_size=thread_pool_size,
+        webhook=os.getenv("UPDATE_MODE") == "webhook",
+        composed_replies=composed_replies,
+    )
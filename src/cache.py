@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe mapping holding at most `max_size` entries, each for at most `ttl` seconds.
+
+    The least recently used entry is evicted once the cache is full. Expired entries are dropped when they are accessed.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, on_evict: Optional[Callable[[K, V], None]] = None):
+        """
+        :param max_size: The maximum number of entries.
+        :param ttl: Optional; the number of seconds an entry is kept after it was last written. Entries never expire if None.
+        :param on_evict: Optional; called with key and value of every entry dropped because the cache is full or expired.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Returns the entry of a key and marks it as recently used.
+
+        :param key: The key to look up.
+        :param default: Optional; returned if there is no entry for the key.
+        :return: The value or the default.
+        """
+        evicted = None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                evicted = self.entries.pop(key)[0]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+        if evicted is not None and self.on_evict is not None:
+            self.on_evict(key, evicted)
+        return default if entry is None else entry[0]
+
+    def put(self, key: K, value: V):
+        """
+        Stores the entry of a key, evicting the least recently used entries if the cache is full.
+
+        :param key: The key.
+        :param value: The value.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        evicted = []
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                evicted_key, (evicted_value, _) = self.entries.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+
+        if self.on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Removes the entry of a key.
+
+        :param key: The key.
+        :param default: Optional; returned if there is no entry for the key.
+        :return: The removed value or the default.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups that found an entry."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __contains__(self, key: K) -> bool:
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry[1] >= time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
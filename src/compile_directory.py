@@ -0,0 +1,106 @@
+"""
+Compiles the directory CSV into a binary file the bot loads on startup without parsing the CSV or importing pandas.
+
+Run from the repository root, e.g. while building the image:
+
+    python -m src.compile_directory
+"""
+import marshal
+import os
+import sys
+from typing import Optional
+
+# Start of every compiled directory, followed by the Python version it was compiled with, since the marshal format may
+# change between versions
+MAGIC = b"ROSSDIR2"
+
+# Columns of the directory rows, in the order their values are stored
+COLUMNS = ("name", "department", "position", "responsibilities", "email", "phone", "location", "description", "programs")
+
+
+class CompiledDirectory:
+    """
+    The directory rows together with the lookup tables derived from them.
+
+    The tool definitions are not stored, since they also depend on the code and are quickly built from the rows.
+    """
+
+    __slots__ = ("records", "people", "postings")
+
+    def __init__(self, records: list[dict], people: list[str], postings: dict[str, dict[str, int]]):
+        """
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        :param people: The description of every row passed to the assistant.
+        :param postings: The rows of every filter value as bitmasks by column, see `DirectoryIndex`.
+        """
+        self.records = records
+        self.people = people
+        self.postings = postings
+
+
+def get_header() -> bytes:
+    return MAGIC + bytes(sys.version_info[:2])
+
+
+def save_compiled(path: str, directory: CompiledDirectory, digest: str):
+    """
+    Writes a compiled directory. The file is replaced at once, so a process loading it never reads a partial file.
+
+    :param path: The file to write.
+    :param directory: The compiled directory.
+    :param digest: The content hash of the CSV file the directory was compiled from.
+    """
+    payload = marshal.dumps({
+        "digest": digest,
+        "rows": [tuple(record[column] for column in COLUMNS) for record in directory.records],
+        "people": directory.people,
+        "postings": directory.postings,
+    })
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(get_header() + payload)
+    os.replace(temporary, path)
+
+
+def load_compiled(path: str, digest: str) -> Optional[CompiledDirectory]:
+    """
+    Reads a compiled directory, if it was compiled from the given content with the running Python version.
+
+    :param path: The compiled file.
+    :param digest: The content hash of the current CSV file.
+    :return: The compiled directory, or None if there is no up-to-date one.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    header = get_header()
+    if not data.startswith(header):
+        return None
+    try:
+        content = marshal.loads(memoryview(data)[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if content.get("digest") != digest:
+        return None
+
+    records = [dict(zip(COLUMNS, row)) for row in content["rows"]]
+    return CompiledDirectory(records, content["people"], content["postings"])
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from src.directory import get_directory_service
+
+    service = get_directory_service()
+    if not service.compiled_path:
+        sys.exit("DIRECTORY_SNAPSHOT is empty, there is nothing to compile to.")
+    service.compile(service.snapshot)
+    print(f"Compiled directory with {len(service.snapshot.records)} people to {service.compiled_path}")
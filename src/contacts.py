@@ -0,0 +1,61 @@
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+class Contact:
+    """The details of a directory entry shown on a contact card."""
+
+    __slots__ = ("name", "position", "department", "phone")
+
+    def __init__(self, name: str, position: str, department: str, phone: str):
+        self.name = name
+        self.position = position
+        self.department = department
+        self.phone = phone
+
+
+class ContactBook:
+    """Lookup table from normalized email addresses to contacts."""
+
+    def __init__(self, records: Iterable[dict]):
+        """
+        Builds the lookup table from the given directory rows.
+
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        """
+        self.contacts: dict[str, Contact] = {}
+        for row in records:
+            email = self.normalize(row["email"])
+            if email and email not in self.contacts:
+                self.contacts[email] = Contact(row["name"], row["position"], row["department"], row["phone"])
+
+    @classmethod
+    def from_df(cls, df: "DataFrame") -> "ContactBook":
+        """
+        Builds the lookup table from a DataFrame as returned by `get_df()`.
+
+        :param df: A pandas DataFrame containing employee contact data.
+        :return: The lookup table over all rows of the DataFrame.
+        """
+        return cls(df.to_dict("records"))
+
+    @staticmethod
+    def normalize(email: str) -> str:
+        """
+        Normalizes an email address for lookups.
+
+        :param email: The email address.
+        :return: The trimmed, lower-cased email address.
+        """
+        return email.strip().lower()
+
+    def get(self, email: str) -> Optional[Contact]:
+        """
+        Returns the contact with the given email address.
+
+        :param email: The email address, case-insensitive.
+        :return: The contact or None if no one has this email address.
+        """
+        return self.contacts.get(self.normalize(email))
@@ -1,17 +1,20 @@
-import pandas as pd
+from typing import IO
 
 
-def get_df():
+def get_df(path: str | IO = "res/data.csv"):
     """
     Reads employee contact information from a CSV file and returns it as a pandas DataFrame.
     
     - The CSV file is expected to contain fields such as name, department, position, responsibilities, email, phone, location, description, and programs.
     - Missing values (NaN) are replaced with empty strings, and all data is converted to string format for consistency.
     
+    :param path: Optional; the path of the CSV file or a file object to read it from.
     :return: A pandas DataFrame containing cleaned employee contact data.
     """
+    import pandas as pd  # Imported on first use, since the bot usually loads the compiled directory instead
+
     cols = ["name", "department", "position", "responsibilities", "email", "phone", "location", "description", "programs"]
-    df = pd.read_csv("res/data.csv", sep=";", header=0, names=cols)
+    df = pd.read_csv(path, sep=";", header=0, names=cols)
     df = df.fillna('').astype(str)
 
     return df
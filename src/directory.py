@@ -0,0 +1,364 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from src.assistant_config import get_tools
+from src.cache import LRUCache
+from src.compile_directory import CompiledDirectory, load_compiled, save_compiled
+from src.contacts import ContactBook
+from src.data import get_df
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+    from src.embeddings import EmbeddingIndex
+
+
+# Filters in the order they are applied by `DirectoryIndex.find`.
+# Each entry is (parameter name, column name, whether the column is a ", "-separated token list).
+FILTERS = [
+    ("department", "department", False),
+    ("position", "position", False),
+    ("responsibility", "responsibilities", True),
+    ("program", "programs", True),
+    ("location", "location", False),
+]
+
+# More results than this are considered ambiguous and the user is asked for more information.
+MAX_RESULTS = 3
+
+# Number of memoized substring lookups. Their values come from the assistant's tool calls, so they are bounded.
+SUBSTRING_MATCHES_SIZE = 1024
+
+
+class DirectoryIndex:
+    """
+    Inverted index over the employee directory.
+
+    Every department, position and location value as well as every single responsibility and program token is mapped
+    to the set of rows containing it. Row sets are stored as integer bitmasks (bit `i` set means row `i` matches),
+    which keeps them compact and makes intersecting filters a single `&` operation.
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        """
+        Builds the index from the given directory rows.
+
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        """
+        self.people: list[str] = []
+        self.substring_matches: LRUCache[tuple[str, str], int] = LRUCache(SUBSTRING_MATCHES_SIZE)
+
+        row_ids: dict[str, dict[str, list[int]]] = {column: {} for _, column, _ in FILTERS}
+        for row_id, row in enumerate(records):
+            self.people.append(self.format_person(row))
+            for _, column, tokenized in FILTERS:
+                values = row[column].split(", ") if tokenized else [row[column]]
+                for value in values:
+                    if value:
+                        row_ids[column].setdefault(value, []).append(row_id)
+
+        self.postings: dict[str, dict[str, int]] = {
+            column: {value: self.to_bitmask(ids, len(self.people)) for value, ids in values.items()}
+            for column, values in row_ids.items()
+        }
+        self.all_rows = (1 << len(self.people)) - 1
+
+    @classmethod
+    def from_df(cls, df: "DataFrame") -> "DirectoryIndex":
+        """
+        Builds the index from a DataFrame as returned by `get_df()`.
+
+        :param df: A pandas DataFrame containing employee contact data.
+        :return: The index over all rows of the DataFrame.
+        """
+        return cls(df.to_dict("records"))
+
+    @classmethod
+    def from_tables(cls, people: list[str], postings: dict[str, dict[str, int]]) -> "DirectoryIndex":
+        """
+        Restores an index from the tables of a compiled directory without going through the rows.
+
+        :param people: The description of every row.
+        :param postings: The rows of every filter value as bitmasks by column.
+        :return: The index.
+        """
+        index = cls.__new__(cls)
+        index.people = people
+        index.substring_matches = LRUCache(SUBSTRING_MATCHES_SIZE)
+        index.postings = postings
+        index.all_rows = (1 << len(people)) - 1
+        return index
+
+    @staticmethod
+    def to_bitmask(row_ids: list[int], row_count: int) -> int:
+        """
+        Converts a list of row ids into a bitmask.
+
+        :param row_ids: The row ids to set.
+        :param row_count: The total number of rows.
+        :return: A bitmask with the bits of the given rows set.
+        """
+        mask = bytearray((row_count + 7) // 8)
+        for row_id in row_ids:
+            mask[row_id >> 3] |= 1 << (row_id & 7)
+        return int.from_bytes(mask, "little")
+
+    @staticmethod
+    def format_person(row: dict) -> str:
+        """
+        Formats a directory row the way it is passed to the assistant.
+
+        :param row: A single directory row.
+        :return: The description of the person.
+        """
+        return f"Name: {row['name']}, Email: {row['email']}, Department: {row['department']}, Position: {row['position']}, Programs: {row['programs']}, Responsibility: {row['description']}"
+
+    def lookup(self, column: str, value: str, tokenized: bool) -> int:
+        """
+        Returns the rows matching a single filter value.
+
+        Token columns match every row with a token containing the value, just like `str.contains` on the joined column.
+        The value is only compared against the distinct tokens, never against the rows, and the result is memoized for the
+        most recently used values.
+
+        :param column: The column to filter.
+        :param value: The value to filter by.
+        :param tokenized: Whether the column is a token list matched by substring.
+        :return: A bitmask of the matching rows.
+        """
+        postings = self.postings[column]
+        if not tokenized:
+            return postings.get(value, 0)
+
+        key = (column, value)
+        rows = self.substring_matches.get(key)
+        if rows is None:
+            rows = 0
+            for token, token_rows in postings.items():
+                if value in token:
+                    rows |= token_rows
+            self.substring_matches.put(key, rows)
+        return rows
+
+    def find(self, parameters: dict) -> int:
+        """
+        Applies the filters in order and skips every filter that would leave no one.
+
+        :param parameters: A dictionary of filter parameters for finding relevant people.
+        :return: A bitmask of the remaining rows.
+        """
+        rows = self.all_rows
+        for name, column, tokenized in FILTERS:
+            value = parameters.get(name)
+            if value:
+                filtered_rows = rows & self.lookup(column, value, tokenized)
+                if filtered_rows:
+                    rows = filtered_rows
+                    print(f"Used filter {name}")
+        return rows
+
+    def get_people(self, rows: int, limit: Optional[int] = None) -> list[str]:
+        """
+        Returns the formatted people of the given rows in directory order.
+
+        :param rows: A bitmask of rows.
+        :param limit: Optional; the maximum number of people to return.
+        :return: The formatted people.
+        """
+        people = []
+        while rows and (limit is None or len(people) < limit):
+            lowest = rows & -rows
+            people.append(self.people[lowest.bit_length() - 1])
+            rows ^= lowest
+        return people
+
+    def get_relevant_people(self, parameters: dict) -> str:
+        """
+        Finds the relevant people and formats the answer for the assistant.
+
+        :param parameters: A dictionary of filter parameters for finding relevant people.
+        :return: A string listing the relevant people or a request for more details if too many results are found.
+        """
+        rows = self.find(parameters)
+        if rows.bit_count() > MAX_RESULTS:
+            return "Please provide more information."
+
+        return "Relevant people:\n- " + "\n- ".join(self.get_people(rows))
+
+
+class DirectorySnapshot:
+    """
+    Immutable view of the directory with all lookups derived from it.
+
+    Requests read `DirectoryService.snapshot` once and use that snapshot throughout, so they see consistent data even
+    if the directory is reloaded meanwhile.
+    """
+
+    def __init__(self, records: list[dict], version: int, digest: str, index: Optional[DirectoryIndex] = None):
+        """
+        Builds all lookups of the directory.
+
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        :param version: The number of the snapshot, increased with every reload.
+        :param digest: The content hash of the directory file.
+        :param index: Optional; the index of a compiled directory, built from the rows if not provided.
+        """
+        self.records = records
+        self.version = version
+        self.digest = digest
+        self.index = index if index is not None else DirectoryIndex(records)
+        self.contacts = ContactBook(records)
+        self.tools = get_tools(records)
+
+    @cached_property
+    def embeddings(self) -> "EmbeddingIndex":
+        """
+        The embedding index, built on first use, so loading a snapshot neither imports numpy nor embeds the directory.
+        """
+        from src.embeddings import get_embedding_index
+
+        return get_embedding_index(self.records)
+
+    def compile(self) -> CompiledDirectory:
+        """
+        :return: The rows of the snapshot together with its lookup tables.
+        """
+        return CompiledDirectory(self.records, self.index.people, self.index.postings)
+
+
+class DirectoryService:
+    """
+    Single source of the employee directory for the whole bot.
+
+    The CSV file is parsed once on startup. If a compiled directory of the same content exists, it is loaded instead of
+    parsing the file, and otherwise it is written after parsing, so the next start is fast. If a watch interval is
+    given, a background thread checks the file for changes and atomically swaps in a new snapshot, notifying the
+    subscribers afterwards. Touching the file without changing its content does not trigger a rebuild, and a file that
+    cannot be parsed keeps the previous snapshot in place.
+    """
+
+    def __init__(self, path: str = "res/data.csv", watch_interval: float = 0, compiled_path: str = ""):
+        """
+        Loads the directory and starts watching it.
+
+        :param path: Optional; the path of the CSV file.
+        :param watch_interval: Optional; the number of seconds between two checks for changes. The file is not watched if 0.
+        :param compiled_path: Optional; the file of the compiled directory, see `src/compile_directory.py`. Not used if empty.
+        """
+        self.path = path
+        self.compiled_path = compiled_path
+        self.listeners: list[Callable[[DirectorySnapshot], None]] = []
+        self.modified = self.get_modified()
+        self.snapshot = self.load(0)
+        if watch_interval > 0:
+            threading.Thread(target=self.watch, args=(watch_interval,), name="directory-watcher", daemon=True).start()
+
+    def subscribe(self, listener: Callable[[DirectorySnapshot], None]):
+        """
+        Registers a function called with every new snapshot after a reload.
+
+        :param listener: The function to call.
+        """
+        self.listeners.append(listener)
+
+    def get_modified(self) -> tuple[float, int]:
+        """
+        :return: The modification time and size of the file.
+        """
+        stat = os.stat(self.path)
+        return stat.st_mtime, stat.st_size
+
+    def read(self) -> tuple[bytes, str]:
+        """
+        Reads the file once, so the parsed content is exactly the hashed one even if the file changes meanwhile.
+
+        :return: The content of the file and its hash.
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        return data, hashlib.sha256(data).hexdigest()
+
+    def load(self, version: int, data: Optional[bytes] = None, digest: Optional[str] = None) -> DirectorySnapshot:
+        """
+        Parses the file and builds a snapshot of it.
+
+        :param version: The number of the new snapshot.
+        :param data: Optional; the content of the file, read if not provided.
+        :param digest: Optional; the hash of the content.
+        :return: The snapshot.
+        """
+        if data is None:
+            data, digest = self.read()
+
+        compiled = load_compiled(self.compiled_path, digest) if self.compiled_path else None
+        if compiled is not None:
+            return DirectorySnapshot(compiled.records, version, digest, DirectoryIndex.from_tables(compiled.people, compiled.postings))
+
+        snapshot = DirectorySnapshot(get_df(io.BytesIO(data)).to_dict("records"), version, digest)
+        if self.compiled_path:
+            self.compile(snapshot)
+        return snapshot
+
+    def compile(self, snapshot: DirectorySnapshot):
+        """
+        Writes the compiled directory of a snapshot. Failing to write it only makes the next start slower.
+
+        :param snapshot: The snapshot to compile.
+        """
+        try:
+            save_compiled(self.compiled_path, snapshot.compile(), snapshot.digest)
+        except OSError as e:
+            print(f"Could not write compiled directory: {e}")
+
+    def watch(self, interval: float):
+        """
+        Reloads the directory whenever the file changed.
+
+        :param interval: The number of seconds between two checks.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Could not reload directory: {e}")
+
+    def reload(self):
+        """
+        Swaps in a new snapshot if the content of the file changed.
+
+        The snapshot is built completely before it is assigned, so readers either see the old or the new one.
+        """
+        modified = self.get_modified()
+        if modified == self.modified:
+            return
+        self.modified = modified
+
+        data, digest = self.read()
+        if digest == self.snapshot.digest:
+            return
+
+        self.snapshot = self.load(self.snapshot.version + 1, data, digest)
+        print(f"Reloaded directory with {len(self.snapshot.records)} people")
+        for listener in self.listeners:
+            listener(self.snapshot)
+
+
+def get_directory_service() -> DirectoryService:
+    """
+    Creates the directory service configured by the environment.
+
+    - `DIRECTORY_PATH` is the CSV file of the directory (default `res/data.csv`).
+    - `DIRECTORY_WATCH_INTERVAL` is the number of seconds between checks for changes of the file (default 0, not watched).
+    - `DIRECTORY_SNAPSHOT` is the file of the compiled directory (default `.cache/directory.bin`, not used if empty).
+
+    :return: The directory service.
+    """
+    path = os.getenv("DIRECTORY_PATH", "res/data.csv")
+    watch_interval = float(os.getenv("DIRECTORY_WATCH_INTERVAL", 0))
+    return DirectoryService(path, watch_interval, os.getenv("DIRECTORY_SNAPSHOT", ".cache/directory.bin"))
@@ -0,0 +1,200 @@
+import threading
+import traceback
+from collections import deque
+from queue import Queue
+from typing import Callable, Optional
+
+from telebot import TeleBot
+from telebot.types import Update
+
+# Key the tasks of a chat are ordered by: the chat ID, or ("update", update ID) for updates without a chat, which can
+# never equal the ID of a real chat
+ChatKey = int | tuple[str, int]
+
+
+class Reservation:
+    """
+    Place in the queue of a chat for a task that is only known later, see `ChatDispatcher.reserve`.
+
+    The tasks of the chat behind it wait until it is filled and has run.
+    """
+
+    def __init__(self, dispatcher: "ChatDispatcher", chat_id: ChatKey):
+        """
+        :param dispatcher: The dispatcher whose queue holds the place.
+        :param chat_id: The chat the place belongs to.
+        """
+        self.dispatcher = dispatcher
+        self.chat_id = chat_id
+        self.task: Optional[tuple[Callable, tuple, dict]] = None
+
+    def fill(self, task: Callable, *args, **kwargs):
+        """
+        Sets the task of the place, so it runs once the tasks before it are done. Only the first task is kept.
+
+        :param task: The function to call.
+        """
+        self.dispatcher.fill(self, (task, args, kwargs))
+
+
+class ChatDispatcher:
+    """
+    Worker pool that runs tasks of different chats in parallel while keeping the tasks of each chat in order.
+
+    Every chat with pending tasks is scheduled on at most one worker at a time, so a slow conversation only delays its
+    own follow-up messages and never the ones of other chats.
+    """
+
+    def __init__(self, num_workers: int):
+        """
+        Starts the worker threads.
+
+        :param num_workers: The number of chats processed in parallel.
+        """
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pending: dict[ChatKey, deque] = {}
+        self.running_chats: set[ChatKey] = set()
+        self.ready: Queue[Optional[ChatKey]] = Queue()
+        self.queued = 0
+        self.running = 0
+        self.workers = [threading.Thread(target=self.work, name=f"dispatch-{i}", daemon=True) for i in range(num_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of tasks waiting for a worker."""
+        return self.queued
+
+    @property
+    def in_flight(self) -> int:
+        """The number of tasks currently being processed."""
+        return self.running
+
+    def submit(self, chat_id: ChatKey, task: Callable, *args, **kwargs):
+        """
+        Queues a task behind all previously submitted tasks of the same chat.
+
+        :param chat_id: The chat the task belongs to, see `get_chat_id`.
+        :param task: The function to call.
+        """
+        with self.lock:
+            self.queued += 1
+            if chat_id in self.pending:
+                self.pending[chat_id].append((task, args, kwargs))
+            else:
+                self.pending[chat_id] = deque([(task, args, kwargs)])
+                self.ready.put(chat_id)
+
+    def reserve(self, chat_id: ChatKey) -> Reservation:
+        """
+        Queues a place for a task that is only known later, e.g. the transcript of a voice message. The tasks of the chat
+        submitted afterwards wait for it without blocking a worker meanwhile. Called from the running task of the chat,
+        the place comes right after that task, before the tasks submitted in the meantime.
+
+        :param chat_id: The chat the task belongs to, see `get_chat_id`.
+        :return: The place, which has to be filled once.
+        """
+        reservation = Reservation(self, chat_id)
+        with self.lock:
+            self.queued += 1
+            if chat_id in self.running_chats:
+                self.pending[chat_id].appendleft(reservation)
+            elif chat_id in self.pending:
+                self.pending[chat_id].append(reservation)
+            else:
+                self.pending[chat_id] = deque([reservation])
+        return reservation
+
+    def fill(self, reservation: Reservation, task: tuple[Callable, tuple, dict]):
+        """
+        Sets the task of a reservation and hands its chat to the workers if the reservation is next.
+
+        :param reservation: The reservation.
+        :param task: The function with its arguments.
+        """
+        with self.lock:
+            if reservation.task is not None:
+                return
+            reservation.task = task
+            chat_id = reservation.chat_id
+            if self.pending[chat_id][0] is reservation and chat_id not in self.running_chats:
+                self.ready.put(chat_id)
+
+    def work(self):
+        """
+        Processes the next task of ready chats until the dispatcher is stopped.
+        """
+        while (chat_id := self.ready.get()) is not None:
+            with self.lock:
+                entry = self.pending[chat_id].popleft()
+                task, args, kwargs = entry.task if isinstance(entry, Reservation) else entry
+                self.queued -= 1
+                self.running += 1
+                self.running_chats.add(chat_id)
+
+            try:
+                task(*args, **kwargs)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.running_chats.discard(chat_id)
+                    pending = self.pending[chat_id]
+                    if not pending:
+                        del self.pending[chat_id]
+                    elif not isinstance(pending[0], Reservation) or pending[0].task is not None:
+                        self.ready.put(chat_id)
+                    if not self.pending and not self.running:
+                        self.idle.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all submitted tasks are done, including the ones submitted meanwhile and reserved ones.
+
+        :param timeout: Optional; the maximum number of seconds to wait. Waits indefinitely if None.
+        :return: True if all tasks are done, False if the timeout expired before.
+        """
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.pending and not self.running, timeout)
+
+    def stop(self):
+        """
+        Stops the workers after they finished their current task. Tasks still queued are dropped, see `join`.
+        """
+        for _ in self.workers:
+            self.ready.put(None)
+
+
+class DispatchingTeleBot(TeleBot):
+    """TeleBot that hands every update to a `ChatDispatcher` instead of handling it on the polling thread."""
+
+    def __init__(self, token: str, dispatcher: ChatDispatcher):
+        """
+        :param token: The Telegram bot token.
+        :param dispatcher: The dispatcher running the handlers.
+        """
+        super().__init__(token, threaded=False)
+        self.dispatcher = dispatcher
+
+    def process_new_updates(self, updates: list[Update]):
+        for update in updates:
+            self.dispatcher.submit(get_chat_id(update), super().process_new_updates, [update])
+
+
+def get_chat_id(update: Update) -> ChatKey:
+    """
+    Determines the chat an update belongs to.
+
+    :param update: The Telegram update.
+    :return: The chat ID, or a key of the update itself for updates without a chat, so they never share a queue or a
+        shard with a chat.
+    """
+    message = update.message or update.edited_message
+    if message is None and update.callback_query is not None:
+        message = update.callback_query.message
+    if message is not None:
+        return message.chat.id
+    return ("update", update.update_id)
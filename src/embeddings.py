@@ -0,0 +1,185 @@
+import hashlib
+import os
+import re
+import zlib
+from typing import TYPE_CHECKING, Iterable, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Columns describing what a person is responsible for
+COLUMNS = ["description", "responsibilities", "programs"]
+
+# Number of dimensions the features are hashed into. Few dimensions let unrelated words collide, which lets short
+# off-topic queries score like real matches
+DIMENSIONS = 4096
+
+# Length of the character n-grams matching word parts. Trigrams are shared by too many unrelated words
+NGRAM = 4
+
+
+class EmbeddingIndex:
+    """
+    Lexical pre-ranking of the directory for free-text lookups.
+
+    Each person's description, responsibilities and programs are embedded by hashing words and character 4-grams into a
+    fixed number of dimensions, weighted by their inverse document frequency. The 4-grams make German compounds match
+    their parts, e.g. "Netzwerk" matches "Netzwerkverwaltung". The L2-normalized embeddings form a matrix, so the cosine
+    similarity of a batch of queries to all people is a single matrix product. The matrix can be saved and
+    memory-mapped.
+
+    The similarity is lexical only: queries match people sharing their words or word parts, not their meaning.
+    """
+
+    def __init__(self, matrix: np.ndarray, idf: np.ndarray):
+        """
+        :param matrix: The normalized embedding of each row, one row per person.
+        :param idf: The inverse document frequency of each dimension.
+        """
+        self.matrix = matrix
+        self.idf = idf
+
+    @classmethod
+    def build(cls, records: Iterable[dict]) -> "EmbeddingIndex":
+        """
+        Embeds the given directory rows.
+
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        :return: The index over all rows.
+        """
+        index = cls(np.empty((0, DIMENSIONS), np.float32), np.ones(DIMENSIONS, np.float32))
+        counts = index.count_features([cls.describe(row) for row in records])
+        document_frequency = np.count_nonzero(counts, axis=0)
+        index.idf = np.log((1 + len(counts)) / (1 + document_frequency)).astype(np.float32) + 1
+        index.matrix = index.normalize(counts * index.idf)
+        return index
+
+    @classmethod
+    def from_df(cls, df: "DataFrame") -> "EmbeddingIndex":
+        """
+        Embeds a DataFrame as returned by `get_df()`.
+
+        :param df: A pandas DataFrame containing employee contact data.
+        :return: The index over all rows of the DataFrame.
+        """
+        return cls.build(df.to_dict("records"))
+
+    @classmethod
+    def load_or_build(cls, records: list[dict], path: str) -> "EmbeddingIndex":
+        """
+        Memory-maps the index saved for the same directory content, or builds and saves it.
+
+        :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+        :param path: The file prefix of the saved index. The hash of the content and the features is appended, so an
+            index of changed data or built with other features is never reused.
+        :return: The index over all rows.
+        """
+        content = f"{DIMENSIONS} {NGRAM}\n" + "\n".join(cls.describe(row) for row in records)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        matrix_path, idf_path = f"{path}-{digest}.matrix.npy", f"{path}-{digest}.idf.npy"
+        if os.path.exists(matrix_path) and os.path.exists(idf_path):
+            return cls(np.load(matrix_path, mmap_mode="r"), np.load(idf_path))
+
+        index = cls.build(records)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for target, array in ((idf_path, index.idf), (matrix_path, index.matrix)):
+            # Saved under a temporary name first, so processes building the same index never read a partial file
+            temporary = f"{target}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                np.save(f, array)
+            os.replace(temporary, target)
+        return index
+
+    @staticmethod
+    def describe(row: dict) -> str:
+        """
+        Returns the text of a directory row that is embedded.
+
+        :param row: A single directory row.
+        :return: The text describing the person's responsibilities.
+        """
+        return " ".join(row[column] for column in COLUMNS)
+
+    @staticmethod
+    def bucket(feature: str) -> int:
+        """
+        Returns the dimension a feature is hashed into. Uses CRC-32, since Python's `hash` differs between processes.
+
+        :param feature: A word or character n-gram.
+        :return: The dimension.
+        """
+        return zlib.crc32(feature.encode("utf-8")) % DIMENSIONS
+
+    def count_features(self, texts: list[str]) -> np.ndarray:
+        """
+        Counts the hashed words and character n-grams of each text.
+
+        :param texts: The texts.
+        :return: A matrix with the feature counts of each text.
+        """
+        counts = np.zeros((len(texts), DIMENSIONS), np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                counts[i, self.bucket(word)] += 1
+                padded = f" {word} "
+                for start in range(len(padded) - NGRAM + 1):
+                    counts[i, self.bucket(padded[start:start + NGRAM])] += 1
+        return counts
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Scales each row to unit length, so dot products are cosine similarities.
+
+        :param vectors: The vectors, one per row.
+        :return: The normalized vectors.
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embeds free-text queries.
+
+        :param texts: The queries.
+        :return: The normalized embedding of each query.
+        """
+        return self.normalize(self.count_features(texts) * self.idf)
+
+    def search(self, queries: list[str], k: int = 3, min_score: float = 0.0) -> list[list[tuple[int, float]]]:
+        """
+        Finds the rows most similar to each query.
+
+        :param queries: The free-text queries.
+        :param k: The maximum number of rows returned per query.
+        :param min_score: The minimum cosine similarity of a returned row.
+        :return: For each query, the row ids and similarities of the best matches, best first.
+        """
+        scores = self.embed(queries) @ self.matrix.T
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-query_scores[candidates])]
+            results.append([(int(row), float(query_scores[row])) for row in ranked if query_scores[row] >= min_score])
+        return results
+
+
+def get_embedding_index(records: list[dict]) -> EmbeddingIndex:
+    """
+    Creates the embedding index of the directory, memory-mapping a saved one if `EMBEDDINGS_PATH` is set.
+
+    :param records: The directory rows as dictionaries with the columns returned by `get_df()`.
+    :return: The embedding index.
+    """
+    path: Optional[str] = os.getenv("EMBEDDINGS_PATH")
+    if path:
+        return EmbeddingIndex.load_or_build(records, path)
+    return EmbeddingIndex.build(records)
@@ -0,0 +1,150 @@
+import os
+from enum import Enum
+from typing import Optional
+
+from src.metrics import metrics
+from src.text import normalize_message
+
+
+class Intent(Enum):
+    """Messages answered from templates instead of by the assistant."""
+    Greeting = "greeting"
+    Thanks = "thanks"
+    Cancel = "cancel"
+    Empty = "empty"  # Messages without any words, e.g. stray emoji
+
+
+# Complete messages recognized per intent after normalization, in the languages users usually write in
+PHRASES = {
+    Intent.Greeting: {
+        "hallo", "hallo zusammen", "hi", "hey", "hey du", "servus", "moin", "moin moin", "guten morgen", "guten tag",
+        "guten abend", "grüß gott", "grüezi", "hello", "hello there", "good morning", "good afternoon", "good evening",
+        "bonjour", "salut", "hola", "ciao", "buongiorno", "merhaba", "cześć", "dzień dobry",
+    },
+    Intent.Thanks: {
+        "danke", "danke dir", "danke schön", "dankeschön", "danke sehr", "vielen dank", "vielen lieben dank", "besten dank",
+        "herzlichen dank", "super danke", "ok danke", "okay danke", "alles klar danke", "perfekt danke", "thanks",
+        "thank you", "thanks a lot", "thank you very much", "many thanks", "thx", "ty", "merci", "merci beaucoup",
+        "gracias", "grazie", "teşekkürler", "dziękuję",
+    },
+    Intent.Cancel: {
+        "abbrechen", "abbruch", "stopp", "stop", "neustart", "neu starten", "von vorne", "zurücksetzen", "reset",
+        "cancel", "restart", "start over", "vergiss es", "never mind", "nevermind",
+    },
+}
+
+# Replies per intent and language, covering the languages of `PHRASES`
+REPLIES = {
+    Intent.Greeting: {
+        "de": "Hallo! Beschreibe mir kurz dein Anliegen, dann finde ich die richtige Ansprechperson.",
+        "en": "Hello! Briefly describe your issue and I will find the right contact person.",
+        "fr": "Bonjour ! Décris-moi brièvement ton problème et je trouverai la bonne personne à contacter.",
+        "es": "¡Hola! Descríbeme brevemente tu problema y encontraré a la persona de contacto adecuada.",
+        "it": "Ciao! Descrivimi brevemente il tuo problema e troverò la persona di riferimento giusta.",
+        "pl": "Cześć! Opisz krótko swój problem, a znajdę odpowiednią osobę kontaktową.",
+        "tr": "Merhaba! Sorununu kısaca anlat, ben de doğru kişiyi bulayım.",
+    },
+    Intent.Thanks: {
+        "de": "Gern geschehen! Melde dich, wenn du wieder jemanden suchst.",
+        "en": "You're welcome! Let me know whenever you are looking for someone again.",
+        "fr": "Avec plaisir ! Écris-moi quand tu cherches à nouveau quelqu'un.",
+        "es": "¡De nada! Escríbeme cuando vuelvas a buscar a alguien.",
+        "it": "Prego! Scrivimi quando cerchi di nuovo qualcuno.",
+        "pl": "Nie ma za co! Napisz, gdy znów będziesz kogoś szukać.",
+        "tr": "Rica ederim! Yine birini aradığında bana yaz.",
+    },
+    Intent.Cancel: {
+        "de": "Alles klar, ich habe das Gespräch zurückgesetzt. Womit kann ich dir helfen?",
+        "en": "Alright, I have reset our conversation. How can I help you?",
+        "fr": "D'accord, j'ai réinitialisé notre conversation. Comment puis-je t'aider ?",
+        "es": "De acuerdo, he reiniciado nuestra conversación. ¿En qué puedo ayudarte?",
+        "it": "Va bene, ho reimpostato la nostra conversazione. Come posso aiutarti?",
+        "pl": "Dobrze, zresetowałem naszą rozmowę. W czym mogę pomóc?",
+        "tr": "Tamam, konuşmamızı sıfırladım. Sana nasıl yardımcı olabilirim?",
+    },
+    Intent.Empty: {
+        "de": "Beschreibe mir bitte in ein paar Worten dein Anliegen, dann finde ich die richtige Ansprechperson.",
+        "en": "Please describe your issue in a few words and I will find the right contact person.",
+        "fr": "Décris-moi ton problème en quelques mots et je trouverai la bonne personne à contacter.",
+        "es": "Descríbeme tu problema en pocas palabras y encontraré a la persona de contacto adecuada.",
+        "it": "Descrivimi il tuo problema in poche parole e troverò la persona di riferimento giusta.",
+        "pl": "Opisz proszę swój problem w kilku słowach, a znajdę odpowiednią osobę kontaktową.",
+        "tr": "Lütfen sorununu birkaç kelimeyle anlat, ben de doğru kişiyi bulayım.",
+    },
+}
+
+# Language of the replies to users whose language is unknown
+DEFAULT_LANGUAGE = "de"
+
+
+class IntentRouter:
+    """
+    Recognizes trivial messages like greetings, thanks and cancellations locally, so they are answered from templates
+    without an assistant run. Only complete messages matching a known phrase are recognized, so a greeting followed by an
+    actual issue still reaches the assistant. Messages of users whose language has no template are forwarded as well, so
+    the assistant answers them in their language.
+
+    Every routed message is counted by its intent, or as `forwarded` if the assistant has to answer it.
+    """
+
+    def __init__(self):
+        self.intents = {phrase: intent for intent, phrases in PHRASES.items() for phrase in phrases}
+
+    def classify(self, request: str) -> Optional[Intent]:
+        """
+        :param request: The user's message.
+        :return: The intent of the message, or None if it is an issue for the assistant.
+        """
+        normalized = normalize_message(request)
+        if not normalized:
+            return Intent.Empty
+        return self.intents.get(normalized)
+
+    @staticmethod
+    def get_reply(intent: Intent, language: Optional[str] = "") -> Optional[str]:
+        """
+        :param intent: The intent of a message.
+        :param language: Optional; the user's language code, e.g. `de` or `en-US`.
+        :return: The reply to the intent in the user's language, or None if there is no template in their language.
+        """
+        return get_template(REPLIES[intent], language)
+
+    def route(self, request: str, language: Optional[str] = "") -> Optional[tuple[Intent, str]]:
+        """
+        Classifies a message and counts it.
+
+        :param request: The user's message.
+        :param language: Optional; the user's language code.
+        :return: The intent of the message and the reply to it, or None if the message is forwarded to the assistant.
+        """
+        intent = self.classify(request)
+        reply = self.get_reply(intent, language) if intent is not None else None
+        metrics.increment("intent_messages_total", intent=intent.value if reply is not None else "forwarded")
+        if reply is None:
+            return None
+        return intent, reply
+
+
+def get_template(templates: dict[str, str], language: Optional[str] = "") -> Optional[str]:
+    """
+    :param templates: A text by language.
+    :param language: Optional; the user's language code, e.g. `de` or `en-US`. Telegram does not always know it.
+    :return: The text in the user's language, in the default language if the user's language is unknown, or None if
+        there is no text in the user's language.
+    """
+    if not language:
+        return templates[DEFAULT_LANGUAGE]
+    return templates.get(language.split("-", 1)[0].lower())
+
+
+def get_intent_router() -> Optional[IntentRouter]:
+    """
+    Creates the intent router configured by the environment.
+
+    - `INTENT_ROUTER` enables answering trivial messages from templates (default 1, 0 forwards every message).
+
+    :return: The intent router, or None if every message is answered by the assistant.
+    """
+    if os.getenv("INTENT_ROUTER", "1") == "0":
+        return None
+    return IntentRouter()
@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
-from src.bot import Bot
+from src.bot import get_bot
 
 load_dotenv()
 
-Bot("rossmann-beispiel.de").start()
+get_bot("rossmann-beispiel.de").start()
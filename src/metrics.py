@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, Optional
+
+# Quantiles reported for every summary
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Number of most recent observations the quantiles of a summary are computed from
+WINDOW_SIZE = 1024
+
+# Labels of a single time series as sorted (name, value) pairs
+Labels = tuple[tuple[str, str], ...]
+
+
+class Summary:
+    """Count and sum of all observations of a time series and the most recent observations for its quantiles."""
+
+    __slots__ = ("count", "sum", "window")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.window: deque[float] = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.window.append(value)
+
+    def quantiles(self) -> list[tuple[float, float]]:
+        """
+        :return: The value of each reported quantile over the most recent observations.
+        """
+        values = sorted(self.window)
+        if not values:
+            return []
+        return [(q, values[min(int(q * len(values)), len(values) - 1)]) for q in QUANTILES]
+
+
+class Metrics:
+    """
+    Thread-safe collection of counters, summaries and gauges, rendered in the Prometheus text format.
+
+    Summaries report p50, p95 and p99 over their most recent observations, together with the count and sum of all of them.
+    Gauges are functions read when the metrics are rendered, so the measured objects need no knowledge of the metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.summaries: dict[str, dict[Labels, Summary]] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}
+        self.help: dict[str, str] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        """
+        Increases a counter.
+
+        :param name: The name of the counter.
+        :param value: Optional; the amount to add.
+        :param labels: The labels of the time series.
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        """
+        Adds an observation to a summary.
+
+        :param name: The name of the summary.
+        :param value: The observed value.
+        :param labels: The labels of the time series.
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = Summary()
+            summary.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Observes the number of seconds the enclosed block takes, including blocks left by an exception.
+
+        :param name: The name of the summary.
+        :param labels: The labels of the time series.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauge(self, name: str, read: Callable[[], float], description: str = ""):
+        """
+        Registers a gauge.
+
+        :param name: The name of the gauge.
+        :param read: Returns the current value of the gauge.
+        :param description: Optional; the help text of the gauge.
+        """
+        with self.lock:
+            self.gauges[name] = read
+            if description:
+                self.help[name] = description
+
+    def describe(self, name: str, description: str):
+        """
+        Sets the help text of a counter or summary.
+
+        :param name: The name of the metric.
+        :param description: The help text.
+        """
+        self.help[name] = description
+
+    def render(self) -> str:
+        """
+        :return: All metrics in the Prometheus text format.
+        """
+        lines = []
+        with self.lock:
+            for name, series in self.counters.items():
+                self.render_header(lines, name, "counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{self.format_labels(labels)} {value}")
+
+            for name, series in self.summaries.items():
+                self.render_header(lines, name, "summary")
+                for labels, summary in series.items():
+                    for quantile, value in summary.quantiles():
+                        lines.append(f"{name}{self.format_labels(labels + (('quantile', str(quantile)),))} {value}")
+                    lines.append(f"{name}_sum{self.format_labels(labels)} {summary.sum}")
+                    lines.append(f"{name}_count{self.format_labels(labels)} {summary.count}")
+
+            gauges = list(self.gauges.items())
+
+        for name, read in gauges:
+            try:
+                value = read()
+            except Exception as e:
+                print(f"Could not read gauge {name}: {e}")
+                continue
+            self.render_header(lines, name, "gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def render_header(self, lines: list[str], name: str, kind: str):
+        if name in self.help:
+            lines.append(f"# HELP {name} {self.help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    @staticmethod
+    def format_labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+# Metrics of the whole process
+metrics = Metrics()
+metrics.describe("openai_request_seconds", "Duration of OpenAI API requests by call.")
+metrics.describe("openai_tokens_total", "Tokens used by assistant runs by kind.")
+metrics.describe("openai_run_tokens", "Total tokens used per completed assistant run.")
+metrics.describe("tool_call_seconds", "Duration of the assistant's tool calls by tool.")
+metrics.describe("voice_seconds", "Duration of the voice message stages download, convert and recognize.")
+metrics.describe("telegram_request_seconds", "Duration of Telegram Bot API requests by method.")
+metrics.describe("intent_messages_total", "Messages answered from templates by intent, or forwarded to the assistant.")
+
+
+class MetricsServer:
+    """Embedded HTTP server answering `GET /metrics` with the current metrics."""
+
+    def __init__(self, port: int, host: str = "0.0.0.0", registry: Metrics = metrics):
+        """
+        :param port: The port to listen on.
+        :param host: Optional; the address to listen on.
+        :param registry: Optional; the metrics to serve, the ones of the process if not provided.
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    def start(self):
+        """
+        Serves the metrics on a background thread.
+        """
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+
+
+def start_metrics_server() -> Optional[MetricsServer]:
+    """
+    Starts the metrics server configured by the environment.
+
+    - `METRICS_PORT` is the port `/metrics` is served on (default 0, not served).
+
+    :return: The running metrics server, or None if metrics are not served.
+    """
+    port = int(os.getenv("METRICS_PORT", 0))
+    if port <= 0:
+        return None
+    server = MetricsServer(port)
+    server.start()
+    print(f"Metrics are served on port {port}...")
+    return server
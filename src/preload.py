@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+import time
+import traceback
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Number of attempts to create the object before the process exits
+ATTEMPTS = 5
+
+# Seconds before the second attempt, doubled after every further failure
+RETRY_DELAY = 1
+
+
+class Preload(Generic[T]):
+    """
+    Creates an object on a background thread, so startup does not wait for slow imports or requests.
+
+    Users call `get()`, which returns right away once the object exists and waits for it otherwise. Creating the object
+    is retried with growing delays, e.g. while the OpenAI API is unreachable. If every attempt failed, the process exits,
+    so it is restarted by the supervisor or Docker instead of failing every request from then on.
+    """
+
+    def __init__(self, create: Callable[[], T], name: str = "preload"):
+        """
+        Starts creating the object.
+
+        :param create: Creates the object.
+        :param name: Optional; the name of the background thread.
+        """
+        self.create = create
+        self.name = name
+        self.ready = threading.Event()
+        self.value: Optional[T] = None
+        threading.Thread(target=self.run, name=name, daemon=True).start()
+
+    def run(self):
+        delay = RETRY_DELAY
+        for attempt in range(1, ATTEMPTS + 1):
+            try:
+                self.value = self.create()
+                self.ready.set()
+                return
+            except Exception:
+                traceback.print_exc()
+            if attempt < ATTEMPTS:
+                print(f"{self.name} failed, retrying in {delay} s ({attempt}/{ATTEMPTS})")
+                time.sleep(delay)
+                delay *= 2
+
+        print(f"{self.name} failed {ATTEMPTS} times, exiting")
+        os._exit(1)
+
+    def get(self) -> T:
+        """
+        :return: The object, once it is created.
+        """
+        self.ready.wait()
+        return self.value
+
+    async def get_async(self) -> T:
+        """
+        Waits for the object on a thread of the event loop, so other coroutines keep running meanwhile.
+
+        :return: The object, once it is created.
+        """
+        if not self.ready.is_set():
+            await asyncio.to_thread(self.ready.wait)
+        return self.value
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from openai import OpenAI, NotFoundError
+
+DEFAULT_CACHE_PATH = ".cache/assistant.json"
+
+
+class AssistantRegistry:
+    """
+    Keeps one OpenAI assistant per bot instead of creating a new one on every start.
+
+    The id of the assistant is cached on disk together with a hash of its configuration. As long as the configuration
+    does not change, a restart reuses the cached id without any request. A changed configuration updates the existing
+    assistant, and a new one is only created if there is none yet.
+    """
+
+    def __init__(self, client: OpenAI, path: str = ""):
+        """
+        :param client: The OpenAI API client.
+        :param path: Optional; the cache file, fetched from the environment `ASSISTANT_CACHE` if not provided.
+        """
+        self.client = client
+        self.path = path or os.getenv("ASSISTANT_CACHE", DEFAULT_CACHE_PATH)
+
+    @staticmethod
+    def config_hash(instruction: str, model: str, tools: list) -> str:
+        """
+        Computes a hash identifying an assistant configuration.
+
+        :param instruction: The assistant's instructions.
+        :param model: The model used by the assistant.
+        :param tools: The tools the assistant may call.
+        :return: The hex digest of the configuration.
+        """
+        config = json.dumps({"instruction": instruction, "model": model, "tools": tools}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+    def get_assistant_id(self, instruction: str, model: str, tools: list) -> str:
+        """
+        Returns the id of an assistant with the given configuration, creating or updating it if necessary.
+
+        :param instruction: The assistant's instructions.
+        :param model: The model used by the assistant.
+        :param tools: The tools the assistant may call.
+        :return: The assistant's id.
+        """
+        config_hash = self.config_hash(instruction, model, tools)
+        cached = self.load()
+        if cached is not None and cached["hash"] == config_hash:
+            return cached["id"]
+
+        assistant_id = None
+        if cached is not None:
+            try:
+                assistant_id = self.client.beta.assistants.update(
+                    cached["id"], instructions=instruction, model=model, tools=tools, metadata={"config_hash": config_hash}
+                ).id
+            except NotFoundError:
+                pass
+        if assistant_id is None:
+            assistant_id = self.client.beta.assistants.create(
+                instructions=instruction, model=model, tools=tools, metadata={"config_hash": config_hash}
+            ).id
+
+        self.save({"id": assistant_id, "hash": config_hash})
+        return assistant_id
+
+    def load(self) -> Optional[dict]:
+        """
+        Reads the cached assistant.
+
+        :return: The cached id and configuration hash, or None if nothing is cached.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, cached: dict):
+        """
+        Writes the cached assistant. The file is replaced atomically from a temporary file of its own, so neither a crash
+        nor processes saving at the same time leave a partial file behind.
+
+        :param cached: The id and configuration hash of the assistant.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cached, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -0,0 +1,154 @@
+import os
+from typing import Optional
+
+from src.cache import LRUCache
+from src.text import normalize_message
+
+# Number of conversations tracked at once while their response may still be cached
+MAX_CONVERSATIONS = 10_000
+
+
+class CachedResponse:
+    """The resolved outcome of a conversation answered by the first message."""
+
+    __slots__ = ("arguments", "emails", "response", "feedback")
+
+    def __init__(self, arguments: list[dict], emails: list[str], response: str, feedback: str):
+        """
+        :param arguments: The arguments the assistant called `get_relevant_people` with.
+        :param emails: The emails of the contacts the assistant answered with.
+        :param response: The assistant's response listing the contacts.
+        :param feedback: The question for feedback sent after the contacts.
+        """
+        self.arguments = arguments
+        self.emails = emails
+        self.response = response
+        self.feedback = feedback
+
+
+class Conversation:
+    """A conversation whose response may be cached, as long as the first message was enough to answer it."""
+
+    __slots__ = ("request", "language", "version", "arguments")
+
+    def __init__(self, request: str, language: str, version: int):
+        self.request = request
+        self.language = language
+        self.version = version
+        self.arguments: list[dict] = []
+
+
+class ResponseCache:
+    """
+    Cache of the contacts found for recurring first messages like "VPN geht nicht".
+
+    Entries are keyed by the normalized first message, the user's language and the version of the directory snapshot they
+    were resolved on, so a reloaded directory never serves stale contacts. Only conversations the assistant answered with
+    contacts right away are cached; a conversation needing clarification depends on more than its first message.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 24 * 60 * 60):
+        """
+        :param max_size: Optional; the maximum number of cached responses.
+        :param ttl: Optional; the number of seconds a response is cached. Responses never expire if None.
+        """
+        self.entries: LRUCache[tuple[str, str, int], CachedResponse] = LRUCache(max_size, ttl)
+        self.conversations: LRUCache[int, Conversation] = LRUCache(MAX_CONVERSATIONS, ttl)
+        self.contexts: LRUCache[int, tuple[str, str]] = LRUCache(MAX_CONVERSATIONS, ttl)
+
+    def get(self, request: str, language: str, version: int) -> Optional[CachedResponse]:
+        """
+        Looks up the response to a first message.
+
+        :param request: The user's message.
+        :param language: The user's language code.
+        :param version: The version of the current directory snapshot.
+        :return: The cached response, or None if there is none.
+        """
+        return self.entries.get((normalize_message(request), language, version))
+
+    def start(self, chat_id: int, request: str, language: str, version: int):
+        """
+        Starts tracking a conversation whose first message is sent to the assistant.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message.
+        :param language: The user's language code.
+        :param version: The version of the directory snapshot the conversation is resolved on.
+        """
+        self.conversations.put(chat_id, Conversation(normalize_message(request), language, version))
+
+    def record(self, chat_id: int, arguments: dict):
+        """
+        Records the arguments of a `get_relevant_people` call of a tracked conversation.
+
+        :param chat_id: The user's chat ID.
+        :param arguments: The arguments of the call.
+        """
+        conversation = self.conversations.get(chat_id)
+        if conversation is not None:
+            conversation.arguments.append(arguments)
+
+    def abandon(self, chat_id: int):
+        """
+        Stops tracking a conversation, e.g. because it needs clarification.
+
+        :param chat_id: The user's chat ID.
+        """
+        self.conversations.pop(chat_id)
+
+    def complete(self, chat_id: int, emails: list[str], response: str, feedback: str):
+        """
+        Caches the response of a tracked conversation once it was answered with contacts.
+
+        :param chat_id: The user's chat ID.
+        :param emails: The emails of the contacts.
+        :param response: The assistant's response listing the contacts.
+        :param feedback: The question for feedback sent after the contacts.
+        """
+        conversation = self.conversations.pop(chat_id)
+        if conversation is not None:
+            key = (conversation.request, conversation.language, conversation.version)
+            self.entries.put(key, CachedResponse(conversation.arguments, emails, response, feedback))
+
+    def remember_context(self, chat_id: int, request: str, response: str):
+        """
+        Remembers the exchange of a conversation answered from the cache. The assistant's thread does not contain it, so
+        it is added once the conversation continues on the thread.
+
+        :param chat_id: The user's chat ID.
+        :param request: The user's message.
+        :param response: The cached response.
+        """
+        self.contexts.put(chat_id, (request, response))
+
+    def pop_context(self, chat_id: int) -> Optional[tuple[str, str]]:
+        """
+        Removes the exchange remembered for a conversation.
+
+        :param chat_id: The user's chat ID.
+        :return: The user's message and the cached response, or None if the conversation was not answered from the cache.
+        """
+        return self.contexts.pop(chat_id)
+
+    def clear(self):
+        """
+        Drops all cached responses and tracked conversations, e.g. after the directory changed.
+        """
+        self.entries.clear()
+        self.conversations.clear()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Creates the response cache configured by the environment.
+
+    - `RESPONSE_CACHE_SIZE` is the number of cached responses (default 0, no cache).
+    - `RESPONSE_CACHE_TTL` is the number of seconds a response is cached (default one day).
+
+    :return: The response cache, or None if responses are not cached.
+    """
+    max_size = int(os.getenv("RESPONSE_CACHE_SIZE", 0))
+    if max_size <= 0:
+        return None
+    return ResponseCache(max_size, float(os.getenv("RESPONSE_CACHE_TTL", 24 * 60 * 60)))
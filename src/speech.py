@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import speech_recognition as sr
+
+SAMPLE_RATE = 16000  # Sample rate expected by the local engines.
+
+# Language Google recognizes the speech of users without a language in, since it requires one
+GOOGLE_DEFAULT_LANGUAGE = "de-DE"
+
+
+class SpeechBackend(ABC):
+    """
+    Engine turning audio into text.
+
+    Implementations raise `sr.UnknownValueError` if the audio contains no recognizable speech and `sr.RequestError` if
+    the engine failed, just like the recognizers of SpeechRecognition.
+    """
+
+    # Optional; the number of seconds a single recognition may take, for engines supporting it
+    timeout: Optional[float] = None
+
+    @abstractmethod
+    def recognize(self, audio: sr.AudioData, language_code: Optional[str]) -> str:
+        """
+        Transcribes the given audio.
+
+        :param audio: The audio to transcribe.
+        :param language_code: The language of the speech, e.g. "de" or "de-DE", or None if the user's language is
+            unknown.
+        :return: The transcribed text.
+        """
+
+
+class GoogleBackend(SpeechBackend):
+    """Recognizes speech with the Google Speech Recognition API."""
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData, language_code: Optional[str]) -> str:
+        self.recognizer.operation_timeout = self.timeout
+        return self.recognizer.recognize_google(audio, language=language_code or GOOGLE_DEFAULT_LANGUAGE)
+
+
+class VoskBackend(SpeechBackend):
+    """
+    Recognizes speech locally with Vosk (https://alphacephei.com/vosk/models).
+
+    The models are loaded once and shared by all requests; only the lightweight recognizer is created per request.
+    """
+
+    def __init__(self, model_paths: dict[str, str]):
+        """
+        Loads the models.
+
+        :param model_paths: The model directory of each language code, e.g. {"de": "models/vosk-model-small-de-0.15"}.
+        """
+        try:
+            from vosk import Model, KaldiRecognizer, SetLogLevel
+        except ImportError as e:
+            raise ImportError("The Vosk backend requires the package 'vosk' (pip install vosk).") from e
+
+        SetLogLevel(-1)
+        self.recognizer_type = KaldiRecognizer
+        self.models = {language: Model(path) for language, path in model_paths.items()}
+        self.default_language = next(iter(model_paths))
+
+    def recognize(self, audio: sr.AudioData, language_code: Optional[str]) -> str:
+        model = self.models.get((language_code or "").split("-")[0], self.models[self.default_language])
+        recognizer = self.recognizer_type(model, SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class WhisperBackend(SpeechBackend):
+    """
+    Recognizes speech locally with a Whisper model (https://github.com/openai/whisper).
+
+    The model is loaded once and shared by all requests. Transcriptions are serialized, since the model already uses all
+    CPU cores for a single one.
+    """
+
+    def __init__(self, model: str = "base"):
+        """
+        Loads the model.
+
+        :param model: The name of the Whisper model, e.g. "tiny", "base" or "small".
+        """
+        try:
+            import numpy
+            import whisper
+        except ImportError as e:
+            raise ImportError("The Whisper backend requires the package 'openai-whisper' (pip install openai-whisper).") from e
+
+        self.numpy = numpy
+        self.model = whisper.load_model(model)
+        self.lock = threading.Lock()
+
+    def recognize(self, audio: sr.AudioData, language_code: Optional[str]) -> str:
+        pcm = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+        samples = self.numpy.frombuffer(pcm, self.numpy.int16).astype(self.numpy.float32) / 32768
+        # Whisper detects the language itself if the user's language is unknown
+        language = language_code.split("-")[0] if language_code else None
+        with self.lock:
+            result = self.model.transcribe(samples, language=language, fp16=False)
+        text = result["text"].strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def get_speech_backend() -> SpeechBackend:
+    """
+    Creates the speech recognition backend configured by the environment.
+
+    - `SPEECH_BACKEND` selects the engine: `google` (default), `vosk` or `whisper`.
+    - `VOSK_MODELS` lists the Vosk model directory of each language, e.g. `de=models/vosk-de,en=models/vosk-en`. The first
+      model is used for all other languages.
+    - `WHISPER_MODEL` is the name of the Whisper model (default `base`).
+
+    :return: The speech backend.
+    """
+    backend = os.getenv("SPEECH_BACKEND", "google")
+    if backend == "vosk":
+        models = dict(entry.split("=", 1) for entry in os.getenv("VOSK_MODELS", "").split(",") if entry)
+        if not models:
+            raise ValueError("VOSK_MODELS must list at least one model, e.g. 'de=models/vosk-model-small-de-0.15'.")
+        return VoskBackend(models)
+    if backend == "whisper":
+        return WhisperBackend(os.getenv("WHISPER_MODEL", "base"))
+    return GoogleBackend()
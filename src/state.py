@@ -0,0 +1,218 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Callable, Optional, TypedDict
+
+from src.cache import LRUCache
+
+
+class Status(Enum):
+    Idle = 0
+    Processing = 1
+    Feedback = 2
+
+
+class AssistantStatus(TypedDict):
+    status: Status
+    thread: str
+
+
+# Called with the chat ID and last state of every conversation dropped by a store
+EvictionCallback = Callable[[int, AssistantStatus], None]
+
+
+class StateStore(ABC):
+    """Storage of the conversation state of each chat."""
+
+    # Optional; called for every conversation dropped from the store because it expired or did not fit anymore
+    on_evict: Optional[EvictionCallback] = None
+
+    @abstractmethod
+    def get(self, chat_id: int) -> Optional[AssistantStatus]:
+        """
+        Returns the state of a chat.
+
+        :param chat_id: The user's chat ID.
+        :return: The state, or None if the chat has no conversation.
+        """
+
+    @abstractmethod
+    def set(self, chat_id: int, state: AssistantStatus):
+        """
+        Stores the state of a chat.
+
+        :param chat_id: The user's chat ID.
+        :param state: The new state.
+        """
+
+    def __getitem__(self, chat_id: int) -> AssistantStatus:
+        state = self.get(chat_id)
+        if state is None:
+            raise KeyError(chat_id)
+        return state
+
+    def __setitem__(self, chat_id: int, state: AssistantStatus):
+        self.set(chat_id, state)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return self.get(chat_id) is not None
+
+
+class MemoryStateStore(StateStore):
+    """Keeps the most recently active conversations in memory. Conversations idle for longer than the TTL are dropped."""
+
+    def __init__(self, max_size: int = 100_000, ttl: Optional[float] = None):
+        """
+        :param max_size: The maximum number of conversations kept.
+        :param ttl: Optional; the number of seconds a conversation is kept after its last change.
+        """
+        self.states: LRUCache[int, AssistantStatus] = LRUCache(max_size, ttl, self.evicted)
+
+    def evicted(self, chat_id: int, state: AssistantStatus):
+        if self.on_evict is not None:
+            self.on_evict(chat_id, state)
+
+    def get(self, chat_id: int) -> Optional[AssistantStatus]:
+        return self.states.get(chat_id)
+
+    def set(self, chat_id: int, state: AssistantStatus):
+        self.states.put(chat_id, state)
+
+
+class SqliteStateStore(StateStore):
+    """
+    Persists conversations in a SQLite database, so they survive restarts.
+
+    Changes are buffered and written in batches by a background thread. Recently used conversations are additionally kept
+    in a bounded in-memory cache, so reading the state does not hit the database on every access.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, cache_size: int = 10_000, flush_interval: float = 1.0):
+        """
+        Opens or creates the database and starts the background writer.
+
+        :param path: The database file.
+        :param ttl: Optional; the number of seconds a conversation is kept after its last change.
+        :param cache_size: The number of conversations cached in memory.
+        :param flush_interval: The number of seconds between two batched writes.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS states (chat_id INTEGER PRIMARY KEY, status INTEGER NOT NULL, thread TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self.connection.commit()
+        self.db_lock = threading.Lock()
+
+        self.ttl = ttl
+        self.cache: LRUCache[int, AssistantStatus] = LRUCache(cache_size, ttl)
+        self.pending: dict[int, tuple[AssistantStatus, float]] = {}
+        self.pending_lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.stopped = threading.Event()
+        threading.Thread(target=self.write_behind, name="state-writer", daemon=True).start()
+        atexit.register(self.close)
+
+    def get(self, chat_id: int) -> Optional[AssistantStatus]:
+        state = self.cache.get(chat_id)
+        if state is not None:
+            return state
+
+        with self.pending_lock:
+            pending = self.pending.get(chat_id)
+        if pending is not None:
+            return pending[0]
+
+        with self.db_lock:
+            row = self.connection.execute("SELECT status, thread, updated_at FROM states WHERE chat_id = ?", (chat_id,)).fetchone()
+        if row is None or (self.ttl is not None and row[2] + self.ttl < time.time()):
+            return None
+
+        state = {"status": Status(row[0]), "thread": row[1]}
+        self.cache.put(chat_id, state)
+        return state
+
+    def set(self, chat_id: int, state: AssistantStatus):
+        self.cache.put(chat_id, state)
+        with self.pending_lock:
+            self.pending[chat_id] = (state, time.time())
+
+    def write_behind(self):
+        """
+        Writes the buffered changes and removes expired conversations periodically until the store is closed.
+        """
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+                self.remove_expired()
+            except sqlite3.Error as e:
+                print(f"Could not write conversation states: {e}")
+
+    def flush(self):
+        """
+        Writes all buffered changes in a single transaction.
+        """
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        rows = [(chat_id, state["status"].value, state["thread"], updated_at) for chat_id, (state, updated_at) in pending.items()]
+        with self.db_lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO states (chat_id, status, thread, updated_at) VALUES (?, ?, ?, ?)", rows)
+
+    def remove_expired(self):
+        """
+        Deletes the conversations that have not changed within the TTL, from the database and from the memory cache, so
+        a chat never gets back a conversation whose thread was released.
+        """
+        if self.ttl is None:
+            return
+
+        expired_before = time.time() - self.ttl
+        with self.db_lock, self.connection:
+            expired = self.connection.execute("SELECT chat_id, status, thread FROM states WHERE updated_at < ?", (expired_before,)).fetchall()
+            self.connection.execute("DELETE FROM states WHERE updated_at < ?", (expired_before,))
+
+        for chat_id, status, thread in expired:
+            with self.pending_lock:
+                changed = chat_id in self.pending
+            if changed:
+                continue
+            self.cache.pop(chat_id)
+            if self.on_evict is not None:
+                self.on_evict(chat_id, {"status": Status(status), "thread": thread})
+
+    def close(self):
+        """
+        Stops the background writer and writes the remaining changes.
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.flush()
+        with self.db_lock:
+            self.connection.close()
+
+
+def get_state_store() -> StateStore:
+    """
+    Creates the state store configured by the environment.
+
+    - `STATE_STORE` selects the backend, either `memory` (default) or `sqlite`.
+    - `STATE_DB` is the database file of the SQLite backend (default `.cache/states.db`).
+    - `STATE_TTL` is the number of seconds a conversation is kept after its last change (default one week).
+    - `STATE_MAX_SIZE` is the number of conversations kept in memory (default 100000).
+
+    :return: The state store.
+    """
+    ttl = float(os.getenv("STATE_TTL", 7 * 24 * 60 * 60))
+    max_size = int(os.getenv("STATE_MAX_SIZE", 100_000))
+    if os.getenv("STATE_STORE", "memory") == "sqlite":
+        return SqliteStateStore(os.getenv("STATE_DB", ".cache/states.db"), ttl, cache_size=max_size)
+    return MemoryStateStore(max_size, ttl)
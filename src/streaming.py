@@ -0,0 +1,71 @@
+import time
+from typing import Optional
+
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+
+
+class LiveMessage:
+    """
+    Telegram message showing a response while it is being streamed.
+
+    The message is sent with the first text and then edited at most once per interval, staying within Telegram's rate
+    limits for message edits.
+    """
+
+    def __init__(self, bot: TeleBot, chat_id: int, interval: float = 1.0):
+        """
+        :param bot: The TeleBot instance used to send and edit the message.
+        :param chat_id: ID of the chat the message is sent to.
+        :param interval: Minimum number of seconds between two edits.
+        """
+        self.bot = bot
+        self.chat_id = chat_id
+        self.interval = interval
+        self.message_id: Optional[int] = None
+        self.text = ""
+        self.updated_at = 0.0
+
+    def update(self, text: str):
+        """
+        Shows the partial response if the last edit is long enough ago.
+
+        :param text: The response received so far.
+        """
+        if time.monotonic() - self.updated_at >= self.interval:
+            self.show(text)
+
+    def finish(self, text: str):
+        """
+        Shows the complete response.
+
+        :param text: The complete response.
+        """
+        self.show(text)
+
+    def discard(self):
+        """
+        Deletes the message, e.g. if the response is presented in another way.
+        """
+        if self.message_id is not None:
+            self.bot.delete_message(self.chat_id, self.message_id)
+            self.message_id = None
+
+    def show(self, text: str):
+        """
+        Sends or edits the message to show the given text.
+
+        :param text: The text to show.
+        """
+        if not text.strip() or text == self.text:
+            return
+
+        if self.message_id is None:
+            self.message_id = self.bot.send_message(self.chat_id, text).message_id
+        else:
+            try:
+                self.bot.edit_message_text(text, self.chat_id, self.message_id)
+            except ApiTelegramException as e:
+                print(f"Could not update message: {e}")
+        self.text = text
+        self.updated_at = time.monotonic()
@@ -0,0 +1,250 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+from telebot import apihelper
+from telebot.types import Update
+
+from src.dispatch import ChatKey, get_chat_id
+from src.metrics import metrics, start_metrics_server
+
+# Email domain of the contacts, as in `src/main.py`
+DOMAIN = "rossmann-beispiel.de"
+
+# Number of points every shard is placed on the hash ring with, which evens out the share of chats per shard
+REPLICAS = 128
+
+# Seconds between checks for worker processes that died
+WATCH_INTERVAL = 5
+
+# Seconds a stopped worker may take to finish its queued updates
+STOP_TIMEOUT = 10
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping chat IDs to shards.
+
+    Changing the number of shards only moves the chats of the added or removed shards, so most conversations stay with
+    the worker, and the state store, that already knows them.
+    """
+
+    def __init__(self, shards: Iterable[int], replicas: int = REPLICAS):
+        """
+        :param shards: The shards to distribute the chats on.
+        :param replicas: Optional; the number of points per shard on the ring.
+        """
+        points = sorted((self.hash(f"{shard}-{replica}"), shard) for shard in shards for replica in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def get_shard(self, chat_id: ChatKey) -> int:
+        """
+        :param chat_id: ID of a chat, see `get_chat_id`.
+        :return: The shard owning the chat.
+        """
+        position = bisect.bisect(self.hashes, self.hash(str(chat_id)))
+        return self.shards[position % len(self.shards)]
+
+
+def run_worker(shard: int, updates: Queue, metrics_port: int):
+    """
+    Handles the updates of one shard until it receives None.
+
+    Workers keep their conversation states in their own store. With `STATE_STORE=sqlite`, every shard has its own database
+    next to `STATE_DB`, so workers never contend for the same file and never expire each other's conversations.
+
+    Updates are always handled by a `ChatDispatcher` with at least one worker, even if `BOT_WORKERS` is 0, so the
+    updates of a chat are handled in order. On stop, the updates received so far are finished before the process exits.
+
+    :param shard: The number of the shard.
+    :param updates: The raw updates of the shard's chats.
+    :param metrics_port: The port the worker's metrics are served on, 0 if they are not served.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ["METRICS_PORT"] = str(metrics_port)
+    root, extension = os.path.splitext(os.getenv("STATE_DB", ".cache/states.db"))
+    os.environ["STATE_DB"] = f"{root}-{shard}{extension}"
+    os.environ["BOT_WORKERS"] = str(max(1, int(os.getenv("BOT_WORKERS", "0"))))
+    from src.bot import get_bot
+
+    bot = get_bot(DOMAIN, "sync")
+    start_metrics_server()
+    print(f"Worker {shard} is running...")
+
+    while (update := updates.get()) is not None:
+        try:
+            bot.bot.process_new_updates([Update.de_json(update)])
+        except Exception as e:
+            print(f"Worker {shard} could not handle update {update.get('update_id')}: {e}")
+    if not bot.dispatcher.join(STOP_TIMEOUT):
+        print(f"Worker {shard} stopped before all updates were handled")
+    bot.dispatcher.stop()
+
+
+class Supervisor:
+    """
+    Front process running one bot per shard in worker processes, so handling updates scales across cores.
+
+    The supervisor is the only process polling Telegram. Every update is routed to the worker owning its chat on a
+    consistent hash ring, so the updates of a chat are always handled by the same process and in order, and each
+    conversation state only lives in one worker. Workers that die are restarted with the queue of their shard.
+    """
+
+    def __init__(self, token: str, shards: int, queue_size: int = 1000, metrics_port: int = 0):
+        """
+        :param token: The Telegram bot token.
+        :param shards: The number of worker processes.
+        :param queue_size: Optional; the number of updates queued per shard before polling waits for the worker.
+        :param metrics_port: Optional; the port of the supervisor's metrics. Worker `i` serves its metrics on the port
+            `metrics_port + 1 + i`. Metrics are not served if 0.
+        """
+        self.token = token
+        self.context = multiprocessing.get_context("spawn")
+        self.ring = HashRing(range(shards))
+        self.queues: list[Queue] = [self.context.Queue(queue_size) for _ in range(shards)]
+        self.workers: list[Optional[BaseProcess]] = [None] * shards
+        self.metrics_port = metrics_port
+        self.stopped = threading.Event()
+        metrics.gauge("shard_queue_depth", lambda: sum(queue.qsize() for queue in self.queues), "Updates waiting for a worker process.")
+        metrics.gauge("shard_workers_alive", lambda: sum(worker is not None and worker.is_alive() for worker in self.workers), "Worker processes running.")
+
+    @staticmethod
+    def prepare():
+        """
+        Loads the directory and resolves the assistant once before the workers start. The compiled directory, the
+        embeddings and the assistant's id are saved, so every worker loads them instead of building its own copy or
+        creating its own assistant.
+        """
+        from openai import OpenAI
+
+        from src.assistant_config import instruction, model
+        from src.directory import DirectoryService
+        from src.registry import AssistantRegistry
+
+        os.environ.setdefault("EMBEDDINGS_PATH", ".cache/embeddings")
+        directory = DirectoryService(os.getenv("DIRECTORY_PATH", "res/data.csv"), compiled_path=os.getenv("DIRECTORY_SNAPSHOT", ".cache/directory.bin"))
+        directory.snapshot.embeddings
+        AssistantRegistry(OpenAI()).get_assistant_id(instruction, model, directory.snapshot.tools)
+
+    def start_worker(self, shard: int):
+        """
+        Starts the worker process of a shard.
+
+        :param shard: The number of the shard.
+        """
+        metrics_port = self.metrics_port + 1 + shard if self.metrics_port > 0 else 0
+        worker = self.context.Process(target=run_worker, args=(shard, self.queues[shard], metrics_port), name=f"shard-{shard}", daemon=True)
+        worker.start()
+        self.workers[shard] = worker
+
+    def watch(self):
+        """
+        Restarts workers that died until the supervisor is stopped.
+        """
+        while not self.stopped.wait(WATCH_INTERVAL):
+            for shard, worker in enumerate(self.workers):
+                if worker is not None and not worker.is_alive() and not self.stopped.is_set():
+                    print(f"Worker {shard} exited with code {worker.exitcode}, restarting...")
+                    self.start_worker(shard)
+
+    def route(self, update: dict):
+        """
+        Queues a raw update for the worker owning its chat.
+
+        :param update: The update as received from Telegram.
+        """
+        shard = self.ring.get_shard(get_chat_id(Update.de_json(update)))
+        metrics.increment("shard_updates_total", shard=str(shard))
+        self.queues[shard].put(update)
+
+    def poll(self):
+        """
+        Polls updates from Telegram and routes them until the supervisor is stopped.
+        """
+        offset = None
+        while not self.stopped.is_set():
+            try:
+                updates = apihelper.get_updates(self.token, offset, limit=100, timeout=20)
+            except Exception as e:
+                print(f"Could not get updates: {e}")
+                time.sleep(3)
+                continue
+
+            for update in updates:
+                offset = update["update_id"] + 1
+                self.route(update)
+
+    def stop(self):
+        """
+        Lets the workers finish their queued updates and stops them.
+        """
+        self.stopped.set()
+        for queue in self.queues:
+            queue.put(None)
+        for worker in self.workers:
+            if worker is not None:
+                worker.join(STOP_TIMEOUT)
+                if worker.is_alive():
+                    worker.terminate()
+
+    def run(self):
+        """
+        Starts the workers and polls updates until the process is interrupted or terminated.
+        """
+        self.prepare()
+        for shard in range(len(self.workers)):
+            self.start_worker(shard)
+        threading.Thread(target=self.watch, name="supervisor", daemon=True).start()
+        signal.signal(signal.SIGTERM, interrupt)
+        start_metrics_server()
+
+        print(f"Supervisor is running with {len(self.workers)} workers...")
+        try:
+            self.poll()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def interrupt(signum: int, frame):
+    """
+    Stops the supervisor on SIGTERM just like on Ctrl+C, so the workers can finish their queued updates.
+    """
+    raise KeyboardInterrupt
+
+
+def get_supervisor() -> Supervisor:
+    """
+    Creates the supervisor configured by the environment.
+
+    - `SHARDS` is the number of worker processes (default the number of CPUs).
+    - `SHARD_QUEUE_SIZE` is the number of updates queued per worker before polling waits (default 1000).
+    - `METRICS_PORT` is the port of the supervisor's metrics, followed by the ports of the workers (default 0, not served).
+
+    :return: The supervisor.
+    """
+    return Supervisor(
+        os.getenv("BOT_TOKEN"),
+        int(os.getenv("SHARDS", os.cpu_count() or 1)),
+        int(os.getenv("SHARD_QUEUE_SIZE", 1000)),
+        int(os.getenv("METRICS_PORT", 0)),
+    )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    get_supervisor().run()
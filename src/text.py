@@ -0,0 +1,11 @@
+import re
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalizes a user's message, so it matches regardless of case, punctuation, emoji and whitespace.
+
+    :param message: The user's message.
+    :return: The lowercase words of the message separated by single spaces, empty if it has no words.
+    """
+    return re.sub(r"[\W_]+", " ", message.lower()).strip()
@@ -0,0 +1,88 @@
+import threading
+import time
+from queue import Queue, Empty
+from typing import Optional
+
+from openai import OpenAI
+
+from src.metrics import metrics
+
+
+class ConversationThreadPool:
+    """
+    Pool of pre-created, unused OpenAI threads.
+
+    Starting a conversation takes a thread from the pool instead of creating one on the request path. A background
+    worker refills the pool whenever it runs low and deletes threads of finished conversations.
+    """
+
+    def __init__(self, client: OpenAI, size: int = 10, refill_below: Optional[int] = None):
+        """
+        Starts the background worker, which immediately fills the pool.
+
+        :param client: The OpenAI API client.
+        :param size: The number of threads kept ready. Threads are always created on demand if 0.
+        :param refill_below: Optional; the pool is refilled once fewer threads are available. Defaults to `size`.
+        """
+        self.client = client
+        self.size = size
+        self.refill_below = size if refill_below is None else refill_below
+        self.available: Queue[str] = Queue()
+        self.abandoned: Queue[str] = Queue()
+        self.wakeup = threading.Event()
+        self.wakeup.set()
+        threading.Thread(target=self.maintain, name="thread-pool", daemon=True).start()
+
+    def try_acquire(self) -> Optional[str]:
+        """
+        Takes a thread from the pool without blocking.
+
+        :return: The thread ID, or None if the pool is empty.
+        """
+        try:
+            thread_id = self.available.get_nowait()
+        except Empty:
+            thread_id = None
+        if self.available.qsize() < self.refill_below:
+            self.wakeup.set()
+        return thread_id
+
+    def acquire(self) -> str:
+        """
+        Takes a thread from the pool, creating one if the pool is empty.
+
+        :return: The thread ID.
+        """
+        thread_id = self.try_acquire()
+        if thread_id is None:
+            with metrics.time("openai_request_seconds", call="threads.create"):
+                thread_id = self.client.beta.threads.create().id
+        return thread_id
+
+    def release(self, thread_id: str):
+        """
+        Marks a thread as no longer used, so it is deleted in the background.
+
+        :param thread_id: The thread ID.
+        """
+        self.abandoned.put(thread_id)
+        self.wakeup.set()
+
+    def maintain(self):
+        """
+        Refills the pool and deletes abandoned threads whenever woken up. Failed requests are retried after a pause.
+        """
+        while self.wakeup.wait():
+            self.wakeup.clear()
+            try:
+                while self.available.qsize() < self.size:
+                    with metrics.time("openai_request_seconds", call="threads.create"):
+                        thread_id = self.client.beta.threads.create().id
+                    self.available.put(thread_id)
+                while not self.abandoned.empty():
+                    with metrics.time("openai_request_seconds", call="threads.delete"):
+                        self.client.beta.threads.delete(self.abandoned.get_nowait())
+            except Exception as e:
+                print(f"Could not maintain thread pool: {e}")
+                time.sleep(5)
+                self.wakeup.set()
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Optional
+
+from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
+
+from src.directory import DirectorySnapshot
+from src.metrics import metrics
+
+# Executes a tool call on a snapshot of the directory with the arguments chosen by the model and returns the output
+ToolHandler = Callable[[DirectorySnapshot, dict], str]
+
+# A tool call as (tool call ID, function name, arguments)
+ToolCall = tuple[str, str, dict]
+
+# Output of a tool call that did not finish in time
+TIMEOUT_OUTPUT = "The tool did not respond in time. Please try again later."
+
+# Output of a tool call that failed
+ERROR_OUTPUT = "The tool failed: {error}. Check the arguments or try another tool."
+
+
+class PendingCall:
+    """A tool call submitted to the thread pool, whose timeout only starts once a worker runs it."""
+
+    def __init__(self, timeout: float):
+        """
+        :param timeout: The number of seconds the call may wait for a worker, and then the number of seconds it may run.
+        """
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.started = threading.Event()
+        self.future: Optional[Future] = None
+
+    def run(self, task: Callable[..., str], *args) -> str:
+        """
+        Runs the call on a worker, restarting its deadline.
+
+        :param task: The function executing the call.
+        :return: The output of the call.
+        """
+        self.deadline = time.monotonic() + self.timeout
+        self.started.set()
+        return task(*args)
+
+    def wait(self) -> str:
+        """
+        Waits for the output of the call.
+
+        :return: The output, or `TIMEOUT_OUTPUT` if the call did not get a worker or did not finish in time.
+        """
+        if not self.started.wait(max(self.deadline - time.monotonic(), 0)) and self.future.cancel():
+            return TIMEOUT_OUTPUT
+        # The call started while it was cancelled, so its deadline is about to be restarted
+        self.started.wait()
+        try:
+            return self.future.result(max(self.deadline - time.monotonic(), 0))
+        except TimeoutError:
+            self.future.cancel()
+            return TIMEOUT_OUTPUT
+
+
+class ToolRegistry:
+    """
+    Maps the function names of the assistant's tools to their handlers and executes the tool calls of a run.
+
+    All calls of a run are executed concurrently on a thread pool, each with the timeout of its tool, so a run requiring
+    several I/O-bound lookups only takes as long as the slowest one. The timeout starts once a worker runs the call; a
+    call waits at most the same time for a free worker. A call that times out is answered with `TIMEOUT_OUTPUT` and a
+    call that fails with `ERROR_OUTPUT`, so the run can always continue; a timed out call keeps running on its thread
+    until it returns.
+    """
+
+    def __init__(self, workers: int = 4, timeout: float = 10):
+        """
+        :param workers: Optional; the number of tool calls executed at once.
+        :param timeout: Optional; the default number of seconds a tool call may take.
+        """
+        self.handlers: dict[str, tuple[ToolHandler, float]] = {}
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tool")
+        self.timeout = timeout
+
+    def register(self, name: str, handler: ToolHandler, timeout: Optional[float] = None):
+        """
+        Registers the handler of a tool.
+
+        :param name: The function name of the tool.
+        :param handler: The function executing calls of the tool.
+        :param timeout: Optional; the number of seconds a call may take, the registry's default if not provided.
+        """
+        self.handlers[name] = (handler, timeout if timeout is not None else self.timeout)
+
+    def get_handler(self, name: str) -> tuple[ToolHandler, float]:
+        """
+        :param name: The function name of a tool.
+        :return: The handler and timeout of the tool.
+        """
+        if name not in self.handlers:
+            raise Exception("Unsupported tool: " + name)
+        return self.handlers[name]
+
+    def get_timeout(self, name: str) -> float:
+        """
+        :param name: The function name of a tool.
+        :return: The timeout of the tool, the registry's default for unsupported tools.
+        """
+        return self.handlers[name][1] if name in self.handlers else self.timeout
+
+    def call(self, name: str, snapshot: DirectorySnapshot, arguments: dict) -> str:
+        """
+        Executes a single tool call and records its duration. Errors are returned as the output of the call.
+
+        :param name: The function name of the tool.
+        :param snapshot: The snapshot of the directory.
+        :param arguments: The arguments of the call.
+        :return: The output of the call.
+        """
+        try:
+            handler, _ = self.get_handler(name)
+            with metrics.time("tool_call_seconds", tool=name):
+                return handler(snapshot, arguments)
+        except Exception as e:
+            print(f"Tool call {name} failed: {e!r}")
+            return ERROR_OUTPUT.format(error=e)
+
+    def execute(self, snapshot: DirectorySnapshot, calls: list[ToolCall]) -> list[ToolOutput]:
+        """
+        Executes tool calls concurrently and waits for all of them.
+
+        :param snapshot: The snapshot of the directory all calls use.
+        :param calls: The tool calls.
+        :return: The outputs of all tool calls in the order of the calls.
+        """
+        pending = []
+        for call_id, name, arguments in calls:
+            call = PendingCall(self.get_timeout(name))
+            call.future = self.executor.submit(call.run, self.call, name, snapshot, arguments)
+            pending.append((call_id, call))
+        return [{"tool_call_id": call_id, "output": call.wait()} for call_id, call in pending]
+
+    async def execute_async(self, snapshot: DirectorySnapshot, calls: list[ToolCall]) -> list[ToolOutput]:
+        """
+        Executes tool calls like `execute`, but awaits them instead of blocking the event loop.
+
+        :param snapshot: The snapshot of the directory all calls use.
+        :param calls: The tool calls.
+        :return: The outputs of all tool calls in the order of the calls.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def execute_call(call_id: str, name: str, arguments: dict) -> ToolOutput:
+            timeout = self.get_timeout(name)
+            started = asyncio.Event()
+
+            def run() -> str:
+                loop.call_soon_threadsafe(started.set)
+                return self.call(name, snapshot, arguments)
+
+            future = loop.run_in_executor(self.executor, run)
+            try:
+                await asyncio.wait_for(started.wait(), timeout)
+                output = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                future.cancel()
+                output = TIMEOUT_OUTPUT
+            return {"tool_call_id": call_id, "output": output}
+
+        return list(await asyncio.gather(*(execute_call(*call) for call in calls)))
+
+
+def get_tool_registry() -> ToolRegistry:
+    """
+    Creates the tool registry configured by the environment.
+
+    - `TOOL_WORKERS` is the number of tool calls executed at once (default 4).
+    - `TOOL_TIMEOUT` is the number of seconds a tool call may run, and wait for a worker before (default 10).
+
+    :return: The tool registry without any tools registered.
+    """
+    return ToolRegistry(int(os.getenv("TOOL_WORKERS", 4)), float(os.getenv("TOOL_TIMEOUT", 10)))
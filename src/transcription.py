@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional
+
+from telebot.types import Voice, User
+
+from src.voice import VoiceRecognizer
+
+BUSY_MESSAGE = "Ich bearbeite gerade zu viele Sprachnachrichten. Bitte versuche es gleich erneut."
+ERROR_MESSAGE = "Ein Fehler ist aufgetreten. Bitte versuche es erneut."
+
+
+class TranscriptionExecutor:
+    """
+    Transcribes voice messages in the background, so they never block the handling of text messages.
+
+    Downloads and recognition requests run on a thread pool, while the CPU-bound decoding runs on a process pool. At most
+    `max_pending` voice messages are accepted at once; further messages are rejected until a slot is free again.
+    """
+
+    def __init__(self, voice_recognizer: VoiceRecognizer, workers: int = 2, decoders: int = 2, max_pending: int = 8, timeout: float = 30):
+        """
+        Starts the pools and lets the voice recognizer decode on the process pool.
+
+        :param voice_recognizer: The voice recognizer transcribing the messages.
+        :param workers: The number of voice messages downloaded and recognized in parallel.
+        :param decoders: The number of processes decoding audio.
+        :param max_pending: The number of voice messages accepted at once, including the ones being transcribed.
+        :param timeout: The number of seconds decoding and recognition of a message may take each.
+        """
+        self.voice_recognizer = voice_recognizer
+        # Spawned instead of forked, since forking a process running other threads can deadlock the child.
+        self.voice_recognizer.offload(ProcessPoolExecutor(decoders, mp_context=multiprocessing.get_context("spawn")), timeout)
+        self.workers = ThreadPoolExecutor(workers, thread_name_prefix="transcription")
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, voice: Voice, user: User, callback: Callable[[str], None], on_error: Callable[[str], None]) -> bool:
+        """
+        Queues a voice message for transcription.
+
+        :param voice: The Voice message object from Telegram.
+        :param user: The User object from Telegram, which contains the language code.
+        :param callback: Called with the transcribed text or an error message once the transcription finished.
+        :param on_error: Called with a message for the user if transcribing or the callback failed.
+        :return: False if too many voice messages are pending and the message was rejected, True otherwise.
+        """
+        if not self.slots.acquire(blocking=False):
+            return False
+
+        future = self.workers.submit(self.transcribe, voice, user, callback)
+        future.add_done_callback(lambda done: self.finish(done, on_error))
+        return True
+
+    def finish(self, future: Future, on_error: Callable[[str], None]):
+        """
+        Frees the slot of a transcribed voice message and reports a failure to the log and the user.
+
+        :param future: The finished transcription.
+        :param on_error: Called with a message for the user if the transcription failed.
+        """
+        self.slots.release()
+        error = future.exception()
+        if error is None:
+            return
+
+        print(f"Could not transcribe voice message: {error!r}")
+        try:
+            on_error(ERROR_MESSAGE)
+        except Exception as e:
+            print(f"Could not report failed transcription: {e!r}")
+
+    def transcribe(self, voice: Voice, user: User, callback: Callable[[str], None]):
+        """
+        Transcribes a voice message and passes the result to the callback.
+
+        :param voice: The Voice message object from Telegram.
+        :param user: The User object from Telegram, which contains the language code.
+        :param callback: Called with the transcribed text or an error message.
+        """
+        callback(self.voice_recognizer.recognize_speech(voice, user))
+
+
+def get_transcription_executor(voice_recognizer: VoiceRecognizer) -> Optional[TranscriptionExecutor]:
+    """
+    Creates the transcription executor configured by the environment.
+
+    - `VOICE_WORKERS` is the number of voice messages transcribed in parallel. Voice messages are transcribed on the
+      thread handling the update if 0 (default). Requires `BOT_WORKERS` > 0, since the transcripts are handed back
+      through the chat's dispatcher queue.
+    - `VOICE_DECODERS` is the number of processes decoding audio (default 2).
+    - `VOICE_QUEUE` is the number of voice messages accepted at once before further ones are rejected (default 8).
+    - `VOICE_TIMEOUT` is the number of seconds decoding and recognition may take each (default 30).
+
+    :param voice_recognizer: The voice recognizer transcribing the messages.
+    :return: The transcription executor, or None if voice messages are transcribed inline.
+    """
+    workers = int(os.getenv("VOICE_WORKERS", 0))
+    if workers <= 0:
+        return None
+    return TranscriptionExecutor(
+        voice_recognizer,
+        workers,
+        int(os.getenv("VOICE_DECODERS", 2)),
+        int(os.getenv("VOICE_QUEUE", 8)),
+        float(os.getenv("VOICE_TIMEOUT", 30)),
+    )
@@ -1,20 +1,128 @@
-import os  # For file operations such as removing temporary files.
-import tempfile  # For creating temporary files to store downloaded audio.
-import speech_recognition as sr  # For converting speech to text using Google's speech recognition API.
-from pydub import AudioSegment  # For handling audio file format conversion (from .ogg to .wav).
+import os  # For reading the cache configuration from the environment.
+import sqlite3  # For persisting cached transcripts.
+import subprocess  # For decoding audio with ffmpeg through pipes.
+import threading  # For serializing writes to the transcript database.
+from concurrent.futures import Executor  # For decoding audio in a separate worker pool.
+from typing import Optional  # For optional parameters.
+import speech_recognition as sr  # For the audio data and errors of speech recognition.
 from telebot import TeleBot  # For interacting with the Telegram API.
 from telebot.types import Voice, User  # For handling voice message and user data from Telegram.
+from src.cache import LRUCache  # For keeping recent transcripts in memory.
+from src.metrics import metrics  # For timing the stages of transcription.
+from src.speech import SpeechBackend, get_speech_backend  # For converting speech to text.
+
+SAMPLE_RATE = 16000  # Sample rate of the audio passed to speech recognition, sufficient for speech.
+SAMPLE_WIDTH = 2  # Bytes per sample of the 16-bit PCM audio.
+
+
+def decode_ogg(data: bytes) -> bytes:
+    """
+    Decodes an .ogg file in memory into raw mono PCM audio.
+
+    The file is piped through ffmpeg, so no temporary files are written. This is a module-level function, so it can be
+    run in a process pool.
+
+    :param data: The content of the .ogg file.
+    :return: The 16-bit PCM samples at `SAMPLE_RATE`.
+    """
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        input=data,
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+class TranscriptCache:
+    """
+    Cache of the transcripts of recent voice messages, keyed by the voice file's unique ID and the language.
+
+    Forwarded or repeated voice messages share the same file, so their transcript is reused without downloading or
+    recognizing the audio again. The cache can optionally be persisted in a SQLite database to survive restarts.
+    """
+
+    def __init__(self, max_size: int = 1000, path: Optional[str] = None):
+        """
+        Initializes the cache and loads the persisted transcripts.
+
+        :param max_size: The maximum number of transcripts kept.
+        :param path: Optional; the database file the transcripts are persisted in.
+        """
+        self.max_size = max_size
+        self.transcripts: LRUCache[tuple[str, str], str] = LRUCache(max_size)
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS transcripts (file_unique_id TEXT NOT NULL, language TEXT NOT NULL, text TEXT NOT NULL, PRIMARY KEY (file_unique_id, language))")
+            rows = self.connection.execute("SELECT file_unique_id, language, text FROM transcripts ORDER BY rowid DESC LIMIT ?", (max_size,)).fetchall()
+            for file_unique_id, language, text in reversed(rows):
+                self.transcripts.put((file_unique_id, language), text)
+
+    @property
+    def hits(self) -> int:
+        """The number of voice messages answered from the cache."""
+        return self.transcripts.hits
+
+    @property
+    def misses(self) -> int:
+        """The number of voice messages that had to be transcribed."""
+        return self.transcripts.misses
+
+    def get(self, voice: Voice, language_code: Optional[str]) -> Optional[str]:
+        """
+        Returns the cached transcript of a voice message.
+
+        :param voice: The Voice message object from Telegram.
+        :param language_code: The language the voice message is recognized in, or None if it is unknown.
+        :return: The transcript, or None if the voice message was not transcribed before.
+        """
+        return self.transcripts.get((voice.file_unique_id, language_code or ""))
+
+    def put(self, voice: Voice, language_code: Optional[str], text: str):
+        """
+        Caches the transcript of a voice message.
+
+        :param voice: The Voice message object from Telegram.
+        :param language_code: The language the voice message was recognized in, or None if it is unknown.
+        :param text: The transcript.
+        """
+        language = language_code or ""
+        self.transcripts.put((voice.file_unique_id, language), text)
+        if self.connection is not None:
+            with self.lock, self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO transcripts (file_unique_id, language, text) VALUES (?, ?, ?)", (voice.file_unique_id, language, text))
+                self.connection.execute("DELETE FROM transcripts WHERE rowid <= (SELECT MAX(rowid) FROM transcripts) - ?", (self.max_size,))
 
 
 class VoiceRecognizer:
-    def __init__(self, bot: TeleBot):
+    def __init__(self, bot: TeleBot, cache: Optional[TranscriptCache] = None, backend: Optional[SpeechBackend] = None):
         """
-        Initializes the VoiceRecognizer with a reference to the Telegram bot and a speech recognizer.
+        Initializes the VoiceRecognizer with a reference to the Telegram bot and a speech recognition backend.
 
         :param bot: The TeleBot instance used to interact with Telegram's API.
+        :param cache: Optional; the cache of transcripts. Every voice message is transcribed if not provided.
+        :param backend: Optional; the speech recognition engine, configured by the environment if not provided.
         """
         self.bot = bot
-        self.recognizer = sr.Recognizer()
+        self.cache = cache
+        self.backend = backend if backend is not None else get_speech_backend()
+        self.decoder: Optional[Executor] = None
+        self.timeout: Optional[float] = None
+
+    def offload(self, decoder: Executor, timeout: float):
+        """
+        Decodes audio on the given executor from now on and limits how long decoding and recognition may take.
+
+        :param decoder: The executor decoding the audio.
+        :param timeout: The number of seconds decoding and recognition may take each.
+        """
+        self.decoder = decoder
+        self.timeout = timeout
+        self.backend.timeout = timeout
 
     def recognize_speech(self, voice: Voice, user: User) -> str:
         """
@@ -24,46 +132,79 @@ class VoiceRecognizer:
         :param user: The User object from Telegram, which contains user-specific data like the language code.
         :return: The transcribed text of the voice message or an error message.
         """
-        language_code = user.language_code
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".ogg") as temp_voice_file:
-            file_path = temp_voice_file.name
-            wav_file_path = file_path.replace(".ogg", ".wav")
-            self.download_voice_to_file(voice, file_path)
+        text = self.get_cached(voice, user.language_code)
+        if text is None:
+            text = self.transcribe(self.download_voice(voice), user.language_code, voice)
+        return text
 
-        audio_data = self.extract_audio_data(file_path, wav_file_path)
+    def get_cached(self, voice: Voice, language_code: Optional[str]) -> Optional[str]:
+        """
+        Returns the cached transcript of a voice message.
 
-        try:
-            return self.recognizer.recognize_google(audio_data, language=language_code)
-        except sr.UnknownValueError:
-            return "Entschuldigung, ich kann dich nicht verstehen."
-        except sr.RequestError as e:
-            print(f"Fehler bei der Spracherkennung: {e}")
-            return "Ein Fehler ist aufgetreten. Bitte versuche es erneut."
-        finally:
-            os.remove(file_path)
-            os.remove(wav_file_path)
+        :param voice: The Voice message object from Telegram.
+        :param language_code: The language of the voice message.
+        :return: The transcript, or None if it is not cached.
+        """
+        return self.cache.get(voice, language_code) if self.cache is not None else None
 
-    def download_voice_to_file(self, voice: Voice, file_path: str):
+    def download_voice(self, voice: Voice) -> bytes:
         """
-        Downloads the voice message from Telegram and writes it to a file.
+        Downloads the voice message from Telegram.
 
         :param voice: The Voice message object containing the file_id to download.
-        :param file_path: The path where the downloaded voice message will be saved.
+        :return: The content of the .ogg file.
+        """
+        with metrics.time("voice_seconds", stage="download"):
+            file_info = self.bot.get_file(voice.file_id)
+            return self.bot.download_file(file_info.file_path)
+
+    def transcribe(self, data: bytes, language_code: Optional[str], voice: Optional[Voice] = None) -> str:
+        """
+        Decodes and transcribes a downloaded voice message into text.
+
+        :param data: The content of the .ogg file.
+        :param language_code: The language of the voice message.
+        :param voice: Optional; the Voice message object the transcript is cached for.
+        :return: The transcribed text of the voice message or an error message.
         """
-        file_info = self.bot.get_file(voice.file_id)
-        downloaded_file = self.bot.download_file(file_info.file_path)
-        with open(file_path, "wb") as new_file:
-            new_file.write(downloaded_file)
+        try:
+            audio = self.extract_audio_data(data)
+            with metrics.time("voice_seconds", stage="recognize"):
+                text = self.backend.recognize(audio, language_code)
+            if voice is not None and self.cache is not None:
+                self.cache.put(voice, language_code, text)
+            return text
+        except sr.UnknownValueError:
+            return "Entschuldigung, ich kann dich nicht verstehen."
+        except (sr.RequestError, subprocess.CalledProcessError, TimeoutError) as e:
+            print(f"Fehler bei der Spracherkennung: {e!r}")
+            return "Ein Fehler ist aufgetreten. Bitte versuche es erneut."
 
-    def extract_audio_data(self, file_path: str, wav_file_path: str) -> sr.AudioData:
+    def extract_audio_data(self, data: bytes) -> sr.AudioData:
         """
-        Converts an .ogg file to .wav format and extracts the audio data for speech recognition.
+        Decodes an .ogg file in memory and extracts the audio data for speech recognition.
 
-        :param file_path: The path to the .ogg file.
-        :param wav_file_path: The path where the converted .wav file will be saved.
+        :param data: The content of the .ogg file.
         :return: Audio data that can be processed by the speech recognizer.
         """
-        ogg_audio = AudioSegment.from_ogg(file_path)
-        ogg_audio.export(wav_file_path, format="wav")
-        with sr.AudioFile(wav_file_path) as source:
-            return self.recognizer.record(source)
+        with metrics.time("voice_seconds", stage="convert"):
+            if self.decoder is None:
+                pcm = decode_ogg(data)
+            else:
+                pcm = self.decoder.submit(decode_ogg, data).result(self.timeout)
+        return sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+
+
+def get_transcript_cache() -> Optional[TranscriptCache]:
+    """
+    Creates the transcript cache configured by the environment.
+
+    - `TRANSCRIPT_CACHE_SIZE` is the number of transcripts kept (default 1000). Transcripts are not cached if 0.
+    - `TRANSCRIPT_CACHE` is the database file the transcripts are persisted in. They are kept in memory only if not set.
+
+    :return: The transcript cache, or None if transcripts are not cached.
+    """
+    max_size = int(os.getenv("TRANSCRIPT_CACHE_SIZE", 1000))
+    if max_size <= 0:
+        return None
+    return TranscriptCache(max_size, os.getenv("TRANSCRIPT_CACHE"))
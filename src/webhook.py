@@ -0,0 +1,135 @@
+import hmac
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot import TeleBot
+from telebot.types import Update
+
+from src.cache import LRUCache
+
+# Header Telegram sends the secret token in, if one was set with the webhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Embedded HTTP server receiving Telegram updates pushed to a webhook instead of polling them.
+
+    Every update is answered right away and then handed to `TeleBot.process_new_updates`, so the registered handlers run
+    exactly as with polling. Telegram redelivers updates it got no answer for, which is why recently seen update ids are
+    remembered and repeated updates are dropped.
+    """
+
+    def __init__(self, bot: TeleBot, url: str = "", host: str = "0.0.0.0", port: int = 8080, path: str = "/", secret_token: str = "", max_seen: int = 10_000):
+        """
+        :param bot: The bot handling the updates.
+        :param url: Optional; the public URL of the webhook. The webhook is not registered if empty, e.g. for local testing.
+        :param host: Optional; the address to listen on.
+        :param port: Optional; the port to listen on.
+        :param path: Optional; the path updates are posted to.
+        :param secret_token: Optional; the token every request has to carry in its secret header. Not checked if empty.
+        :param max_seen: Optional; the number of recent update ids remembered to drop repeated updates.
+        """
+        self.bot = bot
+        self.url = url
+        self.path = path
+        self.secret_token = secret_token
+        self.seen: LRUCache[int, bool] = LRUCache(max_seen)
+        self.seen_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.create_handler())
+        self.server.daemon_threads = True
+
+    def create_handler(self) -> type[BaseHTTPRequestHandler]:
+        """
+        :return: The request handler class passing requests to this server.
+        """
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                webhook.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        """
+        Answers a posted update and processes it afterwards.
+
+        :param request: The request of the update.
+        """
+        if request.path != self.path:
+            return self.respond(request, 404)
+        if self.secret_token and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            return self.respond(request, 403)
+
+        try:
+            body = request.rfile.read(int(request.headers.get("Content-Length", 0)))
+            update = Update.de_json(json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            return self.respond(request, 400)
+
+        self.respond(request, 200)
+        if self.is_new(update.update_id):
+            self.bot.process_new_updates([update])
+
+    @staticmethod
+    def respond(request: BaseHTTPRequestHandler, status: int):
+        """
+        Sends an empty response.
+
+        :param request: The request to answer.
+        :param status: The HTTP status code.
+        """
+        request.send_response(status)
+        request.send_header("Content-Length", "0")
+        request.end_headers()
+
+    def is_new(self, update_id: int) -> bool:
+        """
+        Remembers an update id.
+
+        :param update_id: The id of the received update.
+        :return: False if the update was received before, otherwise True.
+        """
+        with self.seen_lock:
+            if update_id in self.seen:
+                return False
+            self.seen.put(update_id, True)
+            return True
+
+    def serve(self):
+        """
+        Registers the webhook with Telegram and handles requests until the process ends.
+        """
+        if self.url:
+            self.bot.set_webhook(url=self.url, secret_token=self.secret_token or None, drop_pending_updates=False)
+        print(f"Webhook is listening on port {self.server.server_address[1]}...")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+
+def get_webhook_server(bot: TeleBot) -> WebhookServer:
+    """
+    Creates the webhook server configured by the environment.
+
+    - `WEBHOOK_URL` is the public URL registered with Telegram (default empty, not registered).
+    - `WEBHOOK_PORT` and `WEBHOOK_PATH` are where updates are received (default `8080` and `/`).
+    - `WEBHOOK_SECRET` is the token Telegram sends with every update (default empty, not checked).
+
+    :param bot: The bot handling the updates.
+    :return: The webhook server.
+    """
+    return WebhookServer(
+        bot,
+        url=os.getenv("WEBHOOK_URL", ""),
+        port=int(os.getenv("WEBHOOK_PORT", 8080)),
+        path=os.getenv("WEBHOOK_PATH", "/"),
+        secret_token=os.getenv("WEBHOOK_SECRET", ""),
+    )
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from src.assistant import Assistant
+from src.intents import IntentRouter
+from src.response_cache import ResponseCache
+from src.state import MemoryStateStore
+
+CONTACTS = "Relevant people:\n- Name: Lars Müller, Email: lars.mueller@rossmann-beispiel.de"
+
+
+class Threads:
+    """Stand-in for the thread pool, handing out numbered threads."""
+
+    def __init__(self):
+        self.created = 0
+
+    def acquire(self) -> str:
+        self.created += 1
+        return f"thread-{self.created}"
+
+    def release(self, thread: str):
+        pass
+
+
+def create_assistant() -> Assistant:
+    assistant = Assistant.__new__(Assistant)
+    assistant.threads = Threads()
+    assistant.directory = SimpleNamespace(snapshot=SimpleNamespace(version=0))
+    assistant.responses = ResponseCache()
+    assistant.intents = IntentRouter()
+    assistant.states = MemoryStateStore()
+    assistant.messages = []
+    assistant.add_message = lambda chat_id, role, message: assistant.messages.append((assistant.get_thread(chat_id), message))
+    assistant.answer = lambda chat_id, on_text=None: CONTACTS
+    return assistant
+
+
+def answer_with_contacts(assistant: Assistant, chat_id: int, request: str):
+    """Sends a message the assistant answers with contacts, like `Bot.answer_with_contacts`."""
+    assert assistant.process_request(chat_id, request) == CONTACTS
+    assistant.set_feedback(chat_id)
+    assistant.cache_response(chat_id, ["lars.mueller@rossmann-beispiel.de"], CONTACTS, "Konnte ich dir damit weiterhelfen?")
+
+
+def test_first_message_is_cached():
+    assistant = create_assistant()
+    answer_with_contacts(assistant, 1, "VPN geht nicht")
+
+    assert assistant.responses.get("VPN geht nicht", "", 0) is not None
+
+
+def test_message_while_waiting_for_feedback_is_not_cached():
+    assistant = create_assistant()
+    answer_with_contacts(assistant, 1, "Wer betreut das Netzwerk in Hannover?")
+    answer_with_contacts(assistant, 1, "und in Hamburg?")
+
+    # The follow-up was answered on the thread of the first question, so it depends on it
+    assert [thread for thread, _ in assistant.messages] == ["thread-1", "thread-1"]
+    assert assistant.responses.get("und in Hamburg?", "", 0) is None
+    assert assistant.responses.get("Wer betreut das Netzwerk in Hannover?", "", 0) is not None
+
+
+def test_greeting_of_a_new_chat_creates_no_thread():
+    assistant = create_assistant()
+
+    assert assistant.process_request(1, "Hallo", language="de")
+    assert assistant.process_request(1, "Abbrechen", language="de")
+    assert assistant.threads.created == 0
+    assert 1 not in assistant.states
+
+    answer_with_contacts(assistant, 1, "VPN geht nicht")
+    assert assistant.threads.created == 1
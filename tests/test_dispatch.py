@@ -0,0 +1,82 @@
+import threading
+
+from src.dispatch import ChatDispatcher
+
+
+def wait_for(event: threading.Event):
+    assert event.wait(5), "timed out"
+
+
+def test_reservation_keeps_the_order_of_a_chat():
+    dispatcher = ChatDispatcher(2)
+    handled = []
+    done = threading.Event()
+    reserved = threading.Event()
+    reservations = []
+
+    def handle_voice():
+        reservations.append(dispatcher.reserve(1))
+        # A text message of the same chat arrives while the voice message is still being handled
+        dispatcher.submit(1, handle_text)
+        reserved.set()
+
+    def handle_text():
+        handled.append("text")
+        done.set()
+
+    dispatcher.submit(1, handle_voice)
+    wait_for(reserved)
+
+    other_chat = threading.Event()
+    dispatcher.submit(2, other_chat.set)
+    wait_for(other_chat)
+    assert handled == []
+
+    reservations[0].fill(handled.append, "voice")
+    wait_for(done)
+    assert handled == ["voice", "text"]
+    dispatcher.stop()
+
+
+def test_reservation_filled_before_it_is_next():
+    dispatcher = ChatDispatcher(1)
+    handled = []
+    done = threading.Event()
+    release = threading.Event()
+
+    dispatcher.submit(1, release.wait)
+    reservation = dispatcher.reserve(1)
+    dispatcher.submit(1, done.set)
+    reservation.fill(handled.append, "voice")
+    reservation.fill(handled.append, "ignored")
+    release.set()
+
+    wait_for(done)
+    assert handled == ["voice"]
+    assert dispatcher.queue_depth == 0
+    dispatcher.stop()
+
+
+def test_join_waits_for_tasks_submitted_meanwhile():
+    dispatcher = ChatDispatcher(1)
+    handled = []
+
+    def handle(i: int):
+        if i < 3:
+            dispatcher.submit(1, handle, i + 1)
+        handled.append(i)
+
+    dispatcher.submit(1, handle, 0)
+    assert dispatcher.join(5)
+    assert handled == [0, 1, 2, 3]
+    dispatcher.stop()
+
+
+def test_join_waits_for_reservations():
+    dispatcher = ChatDispatcher(1)
+    reservation = dispatcher.reserve(1)
+
+    assert not dispatcher.join(0.1)
+    reservation.fill(lambda: None)
+    assert dispatcher.join(5)
+    dispatcher.stop()
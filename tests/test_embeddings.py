@@ -0,0 +1,54 @@
+import pytest
+
+from src.assistant import MIN_SIMILARITY
+from src.data import get_df
+from src.embeddings import EmbeddingIndex
+
+# Issues as users describe them, with a word of the responsibilities of the person who should be found
+ISSUES = {
+    "Ich kann mich nicht anmelden, die Authentifizierung schlägt fehl": "Authentifizierung",
+    "Unser Netzwerk ist seit heute morgen sehr langsam": "Netzwerk",
+    "Mein Jira Plugin funktioniert nicht mehr": "Plugin",
+    "Die Kasse in der Filiale hat einen Fehler im POS-System": "POS",
+    "Ich brauche eine Lizenz für neue Software": "Lizenz",
+    "Darf ich Kundendaten weitergeben? Frage zum Datenschutz": "Datenschutz",
+    "Die Datenbank ist voll und Abfragen sind langsam": "Datenbank",
+    "Ich habe keine Berechtigung für den Ordner im Active Directory": "Berechtigung",
+    "Das Deployment mit Kubernetes hängt": "Kubernetes",
+    "Who handles cloud security?": "Cloud",
+}
+
+# Messages no one in the directory is responsible for
+OFF_TOPIC = [
+    "Wetter morgen",
+    "Pizza bestellen",
+    "Fußball Ergebnisse",
+    "Hallo wie geht es dir",
+    "Mein Auto springt nicht an",
+    "Wo ist die Kantine",
+    "Tell me a joke",
+    "asdf qwer",
+]
+
+
+@pytest.fixture(scope="module")
+def records() -> list[dict]:
+    return get_df().to_dict("records")
+
+
+@pytest.fixture(scope="module")
+def index(records) -> EmbeddingIndex:
+    return EmbeddingIndex.build(records)
+
+
+@pytest.mark.parametrize("issue, term", ISSUES.items())
+def test_issue_finds_the_responsible_person(index, records, issue, term):
+    matches = index.search([issue], 3, MIN_SIMILARITY)[0]
+    assert matches, f"no one found for {issue!r}"
+    row, _ = matches[0]
+    assert term.lower() in EmbeddingIndex.describe(records[row]).lower()
+
+
+@pytest.mark.parametrize("message", OFF_TOPIC)
+def test_off_topic_message_finds_no_one(index, message):
+    assert index.search([message], 3, MIN_SIMILARITY)[0] == []
@@ -0,0 +1,21 @@
+import speech_recognition as sr
+
+from src.speech import GoogleBackend
+
+
+def recognize(language_code):
+    backend = GoogleBackend()
+    languages = []
+    backend.recognizer.recognize_google = lambda audio, language: languages.append(language) or "Hallo"
+    audio = sr.AudioData(b"\0\0" * 160, 16000, 2)
+    assert backend.recognize(audio, language_code) == "Hallo"
+    return languages[0]
+
+
+def test_google_uses_the_language_of_the_user():
+    assert recognize("en-US") == "en-US"
+
+
+def test_google_falls_back_to_german_without_a_language():
+    assert recognize(None) == "de-DE"
+    assert recognize("") == "de-DE"